@@ -8,6 +8,7 @@ setup(
     packages=[],
     py_modules=['webtool'],
     install_requires=[
+        "numpy~=1.26.4",
         "openlr~=1.0.1",
         "openlr_dereferencer @ git+https://github.com/davidniedzielski-tomtom/openlr-dereferencer-python.git@master",
         "geoutils @ git+https://github.com/davidniedzielski-tomtom/geoutils.git@main",
@@ -0,0 +1,48 @@
+import os
+import sys
+from pytest import fixture, mark
+
+# batch_match is run as a script from the webtool directory and imports its siblings as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "webtool"))
+import batch_match
+
+@fixture
+def codes_file(tmp_path, monkeypatch):
+    def write(content: bytes, range_size: int):
+        fn = tmp_path / "codes"
+        fn.write_bytes(content)
+        monkeypatch.setattr(batch_match, "CODES_FN", str(fn))
+        monkeypatch.setattr(batch_match, "RANGE_SIZE", range_size)
+    return write
+
+def test_code_ranges_empty(codes_file):
+    codes_file(b"", 4)
+    assert(batch_match.code_ranges() == [])
+
+@mark.parametrize("content,range_size,expected", [
+    # every range ends just after a line feed
+    (b"a\nb\nc\n", 1, [(0, 2), (2, 4), (4, 6)]),
+    # RANGE_SIZE lands exactly on a line feed
+    (b"ab\ncd\n", 2, [(0, 3), (3, 6)]),
+    # RANGE_SIZE lands inside a code: the range is extended to the end of that line
+    (b"abc\nde\n", 1, [(0, 4), (4, 7)]),
+    # no trailing line feed: the last range ends at EOF
+    (b"aaa\nbbb", 2, [(0, 4), (4, 7)]),
+    # one range larger than the whole file
+    (b"aaa\nbbb\n", 1024, [(0, 8)]),
+])
+def test_code_ranges(codes_file, content, range_size, expected):
+    codes_file(content, range_size)
+    ranges = batch_match.code_ranges()
+    assert(ranges == expected)
+    assert(b"".join(content[start:end] for start, end in ranges) == content)
+
+def test_match_range_non_ascii(tmp_path, monkeypatch):
+    # the line is counted as a failure without reaching the decoder
+    monkeypatch.setattr(batch_match, "_CODES", b"\xff\xfe\n")
+    monkeypatch.setattr(batch_match, "_SHARD_FN", str(tmp_path / "shard.tsv"))
+    assert(batch_match.match_range((0, 3)) == (0, 1))
+
+def test_print_progress_no_attempts():
+    # an empty codes file finishes without a single attempt
+    batch_match.print_progress(0, 0, batch_match.timeit.default_timer())
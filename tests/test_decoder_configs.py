@@ -0,0 +1,19 @@
+from webtool.decoder_configs import StrictConfig, RelaxedConfig
+from openlr_dereferencer.decoding.configuration import save_config
+from pytest import mark
+from io import StringIO
+import copy
+import json
+import pickle
+
+@mark.parametrize("config", [StrictConfig, RelaxedConfig])
+def test_pickle(config):
+    # configs are sent to the worker processes of batch decodes
+    assert(pickle.loads(pickle.dumps(config)) == config)
+    assert(copy.deepcopy(config) == config)
+
+@mark.parametrize("config", [StrictConfig, RelaxedConfig])
+def test_save_config(config):
+    buf = StringIO()
+    save_config(config, buf)
+    assert(len(json.loads(buf.getvalue())["tolerated_lfrc"]) == len(config.tolerated_lfrc))
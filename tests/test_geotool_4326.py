@@ -1,7 +1,9 @@
 from webtool.geotools import GeoTool_4326
+from openlr import Coordinates
 from pytest import approx
 from shapely import wkt
 from math import degrees, radians
+import numpy as np
 
 gt = GeoTool_4326()
 wkt1 = "LINESTRING(-95.5243893 29.8085368,-95.5243909 29.8088737)"
@@ -25,23 +27,49 @@ ls4_comb = wkt.loads(wkt4_comb)
 ls4a_len = gt.line_string_length(ls4a)
 ls4b_len = gt.line_string_length(ls4b)
 ls4c_len = gt.line_string_length(ls4c)
+ls4_comb_len = gt.line_string_length(ls4_comb)
+
+# first two vertices of ls1, ls2 and ls3
+ls1_p0, ls1_p1 = (Coordinates(lon=lon, lat=lat) for lon, lat in ls1.coords[:2])
+ls2_p0, ls2_p1 = (Coordinates(lon=lon, lat=lat) for lon, lat in ls2.coords[:2])
+ls3_p0, ls3_p1 = (Coordinates(lon=lon, lat=lat) for lon, lat in ls3.coords[:2])
+
+# end points of the ls4 parts
+ls4a_start = ls4a.coords[0]
+ls4b_start = ls4b.coords[0]
+ls4c_start = ls4c.coords[0]
+ls4c_end = ls4c.coords[-1]
+
+# vertex arrays handed straight to gt.interpolate
+coords4b = np.asarray(ls4b.coords, dtype=np.float64)
+coords4_comb = np.asarray(ls4_comb.coords, dtype=np.float64)
+# the same vertices as Coordinates sequences
+path4b = [Coordinates(*c) for c in ls4b.coords]
+path4_comb = [Coordinates(*c) for c in ls4_comb.coords]
 
 def test_bearing():
-    b = gt.bearing(Coordinates(lon=ls1.coords[0][0], lat=ls1.coords[0][1]), Coordinates(lon=ls1.coords[1][0],lat=ls1.coords[1][1]))
+    b = gt.bearing(ls1_p0, ls1_p1)
     assert(degrees(b) == approx(-0.23730179516327252, rel=1e-7))
-    b = gt.bearing(Coordinates(lon=ls1.coords[1][0], lat=ls1.coords[1][1]), Coordinates(lon=ls1.coords[0][0],lat=ls1.coords[0][1]))
+    b = gt.bearing(ls1_p1, ls1_p0)
     assert(degrees(b) == approx(179.76269740946745, rel=1e-7))
 
-    b = gt.bearing(Coordinates(lon=ls2.coords[0][0], lat=ls2.coords[0][1]), Coordinates(lon=ls2.coords[1][0],lat=ls2.coords[1][1]))
+    b = gt.bearing(ls2_p0, ls2_p1)
     assert(degrees(b) == approx(-98.80429346948154, rel=1e-7))
-    b = gt.bearing(Coordinates(lon=ls2.coords[1][0], lat=ls2.coords[1][1]), Coordinates(lon=ls2.coords[0][0],lat=ls2.coords[0][1]))
+    b = gt.bearing(ls2_p1, ls2_p0)
     assert(degrees(b) == approx(81.19556514121741, rel=1e-7))
 
-    b = gt.bearing(Coordinates(lon=ls3.coords[0][0], lat=ls3.coords[0][1]), Coordinates(lon=ls3.coords[1][0],lat=ls3.coords[1][1]))
+    b = gt.bearing(ls3_p0, ls3_p1)
     assert(degrees(b) == approx(138.95634225020362, rel=1e-7))
-    b = gt.bearing(Coordinates(lon=ls3.coords[1][0], lat=ls3.coords[1][1]), Coordinates(lon=ls3.coords[0][0],lat=ls3.coords[0][1]))
+    b = gt.bearing(ls3_p1, ls3_p0)
     assert(degrees(b) == approx(-41.043502565479656, rel=1e-7))
 
+def test_bearing_batch():
+    src = np.array([ls1_p0, ls1_p1, ls2_p0, ls2_p1, ls3_p0, ls3_p1])
+    dst = np.array([ls1_p1, ls1_p0, ls2_p1, ls2_p0, ls3_p1, ls3_p0])
+    expected = np.radians([-0.23730179516327252, 179.76269740946745, -98.80429346948154,
+                           81.19556514121741, 138.95634225020362, -41.043502565479656])
+    np.testing.assert_allclose(gt.bearing_batch(src, dst), expected, rtol=1e-7)
+
 def test_transform():
     wgs1 = Coordinates(lon=-95.04189848899841, lat=29.41189169883728)
     xy1 = gt.transform_coordinate(wgs1)
@@ -49,81 +77,92 @@ def test_transform():
     assert(xy1.lat == approx(29.41189169883728, rel=1e-7))
     
 def test_distance():
-    b = gt.distance(Coordinates(lon=ls2.coords[0][0], lat=ls2.coords[0][1]), Coordinates(lon=ls2.coords[1][0],lat=ls2.coords[1][1]))
+    b = gt.distance(ls2_p0, ls2_p1)
     assert(b == approx(24.563082409554156, rel=1e-7))
-    b = gt.distance(Coordinates(lon=ls2.coords[1][0], lat=ls2.coords[1][1]), Coordinates(lon=ls2.coords[0][0],lat=ls2.coords[0][1]))
+    b = gt.distance(ls2_p1, ls2_p0)
     assert(b == approx(24.563082409554156, rel=1e-7))
 
 def test_line_string_length():
-    assert(gt.line_string_length(ls1) == approx(37.34542416957637, 1e-7))
-    assert(gt.line_string_length(ls2) == approx(442.6299118813308, 1e-7))
-    assert(gt.line_string_length(ls3) == approx(598.4771966218154, 1e-7))
-    assert(gt.line_string_length(ls4a) == approx(142.3646031374206, 1e-7))
-    assert(gt.line_string_length(ls4b) == approx(486.0726622282324, 1e-7))
-    assert(gt.line_string_length(ls4c) == approx(377.2645813272347, 1e-7))
+    lengths = [gt.line_string_length(ls) for ls in (ls1, ls2, ls3, ls4a, ls4b, ls4c)]
+    expected = [37.34542416957637, 442.6299118813308, 598.4771966218154,
+                142.3646031374206, 486.0726622282324, 377.2645813272347]
+    np.testing.assert_allclose(lengths, expected, rtol=1e-7)
 
 def test_extrapolate():
-    x = gt.extrapolate(Coordinates(lon=ls1.coords[0][0], lat=ls1.coords[0][1]),37.34542416957637, radians(-0.23730179516327252))
+    x = gt.extrapolate(ls1_p0,37.34542416957637, radians(-0.23730179516327252))
     assert(x.lon == approx(-95.5243909, rel=1e-7))
     assert(x.lat == approx(29.8088737, rel=1e-7))
 
-    x = gt.extrapolate(Coordinates(lon=ls2.coords[0][0], lat=ls2.coords[0][1]),24.563082409554156, radians(-98.80429346948154))
+    x = gt.extrapolate(ls2_p0,24.563082409554156, radians(-98.80429346948154))
     assert(x.lon == approx(-97.1931752, rel=1e-7))
     assert(x.lat == approx(32.9859218, rel=1e-7))
 
-    x = gt.extrapolate(Coordinates(lon=ls3.coords[0][0], lat=ls3.coords[0][1]),40.84844099617549, radians(138.95634225020362))
+    x = gt.extrapolate(ls3_p0,40.84844099617549, radians(138.95634225020362))
     assert(x.lon == approx(-94.2670405, rel=1e-7))
     assert(x.lat == approx(32.8091639, rel=1e-7))
 
 def test_interpolate():
-    c = gt.interpolate([Coordinates(*c) for c in ls4b.coords], 0.0)
-    assert(c.lon == ls4b.coords[0][0])
-    assert(c.lat == ls4b.coords[0][1])
+    c = gt.interpolate(path4b, 0.0)
+    assert(c.lon == ls4b_start[0])
+    assert(c.lat == ls4b_start[1])
 
-    c = gt.interpolate([Coordinates(*c) for c in ls4b.coords], 243.5)
+    c = gt.interpolate(path4b, 243.5)
     assert(c.lon == approx(-94.87434772790684, 1e-7))
     assert(c.lat == approx(29.25999640728569, 1e-7))
 
-    c = gt.interpolate([Coordinates(*c) for c in ls4_comb.coords], ls4a_len + ls4b_len)
-    assert(c.lon == approx(ls4c.coords[0][0], rel=1e-7))
-    assert(c.lat == approx(ls4c.coords[0][1], rel=1e-7))
+    c = gt.interpolate(path4_comb, ls4a_len + ls4b_len)
+    assert(c.lon == approx(ls4c_start[0], rel=1e-7))
+    assert(c.lat == approx(ls4c_start[1], rel=1e-7))
 
-    c = gt.interpolate([Coordinates(*c) for c in ls4_comb.coords], ls4a_len + 243.5)
+    c = gt.interpolate(path4_comb, ls4a_len + 243.5)
     assert(c.lon == approx(-94.87434772790684, 1e-7))
     assert(c.lat == approx(29.25999640728569, 1e-7))
 
+def test_interpolate_array():
+    c = gt.interpolate(coords4b, 0.0)
+    assert(c.lon == ls4b_start[0])
+    assert(c.lat == ls4b_start[1])
+
+    c = gt.interpolate(coords4_comb, ls4a_len + 243.5)
+    assert(c.lon == approx(-94.87434772790684, 1e-7))
+    assert(c.lat == approx(29.25999640728569, 1e-7))
+
+    c = gt.interpolate(coords4_comb, 10000.0)
+    assert(c.lon == ls4c_end[0])
+    assert(c.lat == ls4c_end[1])
+
 def test_split_line():
     first,second = gt.split_line(ls4b, 243.5)
     assert(first is not None)
     assert(second is not None)
-    assert(gt.line_string_length(first) + gt.line_string_length(second) == approx(gt.line_string_length(ls4b), rel=1e-7))
+    assert(gt.line_string_length(first) + gt.line_string_length(second) == approx(ls4b_len, rel=1e-7))
 
     first,second = gt.split_line(ls4_comb, 243.5)
     assert(first is not None)
     assert(second is not None)
-    assert(gt.line_string_length(first) + gt.line_string_length(second) == approx(gt.line_string_length(ls4_comb), rel=1e-7))
+    assert(gt.line_string_length(first) + gt.line_string_length(second) == approx(ls4_comb_len, rel=1e-7))
 
     first,second = gt.split_line(ls4_comb, 0.0)
     assert(first is None)
     assert(second is not None)
-    assert(second.coords[0][0] == approx(ls4a.coords[0][0], rel=1e-7))
-    assert(second.coords[0][1] == approx(ls4a.coords[0][1], rel=1e-7))
+    assert(second.coords[0][0] == approx(ls4a_start[0], rel=1e-7))
+    assert(second.coords[0][1] == approx(ls4a_start[1], rel=1e-7))
 
-    first,second = gt.split_line(ls4_comb, gt.line_string_length(ls4a))
+    first,second = gt.split_line(ls4_comb, ls4a_len)
     assert(first is not None)
     assert(second is not None)
-    assert(first.coords[-1][0] == approx(ls4b.coords[0][0], rel=1e-7))
-    assert(first.coords[-1][1] == approx(ls4b.coords[0][1], rel=1e-7))
-    assert(second.coords[0][0] == approx(ls4b.coords[0][0], rel=1e-7))
-    assert(second.coords[0][1] == approx(ls4b.coords[0][1], rel=1e-7))
+    assert(first.coords[-1][0] == approx(ls4b_start[0], rel=1e-7))
+    assert(first.coords[-1][1] == approx(ls4b_start[1], rel=1e-7))
+    assert(second.coords[0][0] == approx(ls4b_start[0], rel=1e-7))
+    assert(second.coords[0][1] == approx(ls4b_start[1], rel=1e-7))
 
-    first,second = gt.split_line(ls4_comb, gt.line_string_length(ls4a) + gt.line_string_length(ls4b))
+    first,second = gt.split_line(ls4_comb, ls4a_len + ls4b_len)
     assert(first is not None)
     assert(second is not None)
-    assert(first.coords[-1][0] == approx(ls4c.coords[0][0], rel=1e-7))
-    assert(first.coords[-1][1] == approx(ls4c.coords[0][1], rel=1e-7))
-    assert(second.coords[0][0] == approx(ls4c.coords[0][0], rel=1e-7))
-    assert(second.coords[0][1] == approx(ls4c.coords[0][1], rel=1e-7))
+    assert(first.coords[-1][0] == approx(ls4c_start[0], rel=1e-7))
+    assert(first.coords[-1][1] == approx(ls4c_start[1], rel=1e-7))
+    assert(second.coords[0][0] == approx(ls4c_start[0], rel=1e-7))
+    assert(second.coords[0][1] == approx(ls4c_start[1], rel=1e-7))
 "Contains a test case for WGS84 functions"
 
 import unittest
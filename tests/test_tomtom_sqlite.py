@@ -3,22 +3,35 @@ from webtool.decoder_configs import StrictConfig, RelaxedConfig
 from webtool.map_databases import TomTomMapReaderSQLite
 from webtool.geotools import GeoTool_4326
 from openlr import Coordinates
+import os
 import unittest
 
+# Location of the test map and of the spatialite extension, overridable from the environment
+DATA_DIR = os.environ.get("OPENLR_DATA_DIR", "/Users/dave/projects/python/openlr/data")
+DB_FILENAME = os.path.join(DATA_DIR, "lux-orbis.db")
+MOD_SPATIALITE = os.environ.get("MOD_SPATIALITE", "/opt/homebrew/anaconda3/envs/openlr/lib/mod_spatialite")
 
+
+@unittest.skipUnless(os.path.exists(DB_FILENAME), "local DB only")
 class TomTomSqliteTests(unittest.TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
+        # The map is only read, so one reader (and one spatialite load) serves every test
         #logging.basicConfig(level=logging.DEBUG)
-        self.rdr = TomTomMapReaderSQLite(
-            db_filename="/Users/dave/projects/python/openlr/data/lux-orbis.db",
-            mod_spatialite="/opt/homebrew/anaconda3/envs/openlr/lib/mod_spatialite",
+        cls.rdr = TomTomMapReaderSQLite(
+            db_filename=DB_FILENAME,
+            mod_spatialite=MOD_SPATIALITE,
             lines_table="links",
             nodes_table="junctions",
             geo_tool=GeoTool_4326(),
             config=StrictConfig
         )
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.rdr.connection.close()
+
     def test_find_lines_close_to(self):
         coords = Coordinates(lon=6.003845930099487, lat=49.56238389015198)
         res = list(self.rdr.find_lines_close_to(coords, 30))
@@ -4,15 +4,19 @@
 """
 
 import logging
+import mmap
 import multiprocessing as mp
+import os
+import shutil
+import tempfile
 import timeit
-from multiprocessing import Queue, cpu_count
-from typing import List, cast
+from multiprocessing import cpu_count
+from typing import List, Optional, Tuple, Union
 
 from decoder_configs import StrictConfig, RelaxedConfig
 from geotools.geotool_4326 import GeoTool_4326
-from openlr_dereferencer.decoding import LineLocation, MapObjects, PointAlongLine, Coordinates
-from map_databases.webtool_sqlite import WebToolMapReaderSQLite, Line
+from openlr_dereferencer.decoding import LineLocation, LRDecodeError, MapObjects, PointAlongLine, Coordinates
+from map_databases.webtool_sqlite import WebToolMapReaderSQLite
 
 logging.basicConfig(level=logging.WARNING)
 
@@ -35,10 +39,13 @@ SCHEMA = "texas"
 # PostgreSQL port
 PORT = 5432
 
-# Special purpose queue message
-POISON_PILL_MSG="__DONE__"
+# Special purpose result message
 FAILED_DECODING_MSG="__FAILED__"
 
+# Approximate number of bytes of the codes file handed to a worker process at a time.
+# Each range is extended to the next line feed so that no code is split.
+RANGE_SIZE = 64 * 1024
+
 # File containing binary-encoded openlr codes to be matched.
 # One per line, lines terminated by line feeds
 CODES_FN = "/Users/dave/projects/python/openlr/data/france.overture.openlrs"
@@ -48,67 +55,28 @@ CODES_FN = "/Users/dave/projects/python/openlr/data/france.overture.openlrs"
 #OUTPUT_FN = "/Users/dave/projects/python/openlr/data/france.decoded"
 OUTPUT_FN = "/dev/null"
 
+# Map reader, read-only mapping of CODES_FN and output shard path owned by each worker
+# process.  They are set once by init_worker() when the pool starts the process.
+_RDR: Optional[WebToolMapReaderSQLite] = None
+_CODES: Optional[Union[mmap.mmap, bytes]] = None
+_SHARD_FN: Optional[str] = None
+
 
-def load_queue(q):
-    """
-        This loader process reads a file containing the openlr codes to be decoded and places each code on
-        the worker input queue.  At EOF, it inserts WORKER_COUNT "poison pills" into the queue so 
-        that each worker receives one and shuts itself down
-    """
-    with open(CODES_FN, "r") as infile:
-        for line in infile.readlines():
-            q.put(line.rstrip())
-    for _ in range(WORKER_COUNT):
-        q.put(POISON_PILL_MSG)
-
-
-def worker(id: int, q_in: Queue, q_out: Queue):
-    """
-        Each worker takes a record off the queue and attempts to decode it.  If it successful, it places a tuple
-        containing the code as well as the decoded coordinates on the writer input queue.  If it is unsuccessful,
-        it places a FAILED_DECODING_MSG message on the writer's queue.  WHen it sees a poison pill message, it 
-        places a POISON_PILL_MSG message on the writer queue and terminates.
-    """
-
-    def enqueue(r: MapObjects) -> None:
-        data = ()
-
-        if isinstance(result, LineLocation):
-            data = (
-                code,
-                repr([(c.lon, c.lat) for c in result.coordinates()]),
-                repr([(l.meta, l.line_id > 0)
-                     for l in cast(List[Line], result.lines)]),
-                result.p_off,
-                result.n_off
-            )
-        elif isinstance(result, PointAlongLine):
-            lon, lat = result.coordinates()
-            data = (
-                code,
-                repr([(lon, lat)]),
-                repr([cast(Line, result.line)]),
-                result.positive_offset,
-                0.0
-            )
-        elif isinstance(result, Coordinates):
-            lon, lat = result
-            data = (
-                code,
-                repr([(lon, lat)]),
-                repr([]),
-                0.0,
-                0.0
-            )
-        else:
-            logging.warning(
-                "Unexpected map object type: {} returned from decode.  Only (LineLocations, PointALongLine, "
-                "Coordinates) currently supported", type(result))
-            return
-
-        q_out.put(data)
-
-    rdr = WebToolMapReaderSQLite(
+def init_worker(shard_dir: str):
+    """
+        Pool initializer: opens the map database and maps the codes file once per worker process,
+        so that every code decoded by this worker reuses the same reader and connection.
+        Decoded rows are written by the worker to its own shard file in shard_dir.
+    """
+    global _RDR, _CODES, _SHARD_FN
+    _SHARD_FN = os.path.join(shard_dir, f"{os.getpid()}.tsv")
+    # an empty file cannot be mapped; it yields no code ranges, so nothing reads it
+    if os.path.getsize(CODES_FN) == 0:
+        _CODES = b""
+    else:
+        with open(CODES_FN, "rb") as infile:
+            _CODES = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    _RDR = WebToolMapReaderSQLite(
         db_filename="/Users/dave/projects/python/openlr/data/france.sqlite",
         geo_tool=GeoTool_4326(),
         #spatialite_target="/Users/dave/opt/anaconda3/envs/openlr-3.10/lib/mod_spatialite",
@@ -116,9 +84,10 @@ def worker(id: int, q_in: Queue, q_out: Queue):
         mod_spatialite="/usr/local/lib/mod_spatialite",
         lines_table="roads",
         nodes_table="intersections",
-        config=StrictConfig
+        config=StrictConfig,
+        immutable=True
     )
-    # rdr = WebToolMapReader(
+    # _RDR = WebToolMapReader(
     #     lines_table=LINES_TABLE,
     #     nodes_table=NODES_TABLE,
     #     user=USER,
@@ -129,23 +98,143 @@ def worker(id: int, q_in: Queue, q_out: Queue):
     #     port=PORT,
     #     config=STRICT_CONFIG
     # )
+    logging.info(f"Worker {mp.current_process().name} initialized")
+
+
+def code_ranges() -> List[Tuple[int, int]]:
+    """
+        Splits CODES_FN into (start, end) byte ranges of roughly RANGE_SIZE bytes, each ending
+        just after a line feed (or at EOF).  Only these offsets are sent to the workers, which
+        read the codes themselves from their own mapping of the file.
+    """
+    if os.path.getsize(CODES_FN) == 0:
+        return []
+    ranges = []
+    with open(CODES_FN, "rb") as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + RANGE_SIZE, size))
+            end = size if end == -1 else end + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def line_location_row(code: str, result: LineLocation) -> Tuple:
+    """
+        Builds the output record for a decoded LineLocation
+    """
+    return (
+        code,
+        "[" + ", ".join(f"({c.lon}, {c.lat})" for c in result.coordinates()) + "]",
+        "[" + ", ".join(f"({l.meta!r}, {l.line_id > 0})" for l in result.lines) + "]",
+        result.p_off,
+        result.n_off
+    )
+
+
+def point_along_line_row(code: str, result: PointAlongLine) -> Tuple:
+    """
+        Builds the output record for a decoded PointAlongLine
+    """
+    lon, lat = result.coordinates()
+    return (
+        code,
+        f"[({lon}, {lat})]",
+        repr([result.line]),
+        result.positive_offset,
+        0.0
+    )
+
+
+def coordinates_row(code: str, result: Coordinates) -> Tuple:
+    """
+        Builds the output record for decoded Coordinates
+    """
+    lon, lat = result
+    return (
+        code,
+        f"[({lon}, {lat})]",
+        "[]",
+        0.0,
+        0.0
+    )
+
+
+# Output record builders, keyed on the exact type of map object returned by the decoder
+_ROW_BUILDERS = {
+    LineLocation: line_location_row,
+    PointAlongLine: point_along_line_row,
+    Coordinates: coordinates_row,
+}
+
 
-    logging.info(f"Worker {id} initialized")
-    code = q_in.get()
+def build_row(code: str, result: MapObjects) -> Optional[Tuple]:
+    """
+        Builds the output record for a successfully decoded code.  Returns None if the decoder
+        returned an unsupported map object type.
+    """
+    builder = _ROW_BUILDERS.get(type(result))
+    if builder is None:
+        logging.warning(
+            "Unexpected map object type: {} returned from decode.  Only (LineLocations, PointALongLine, "
+            "Coordinates) currently supported", type(result))
+        return None
+    return builder(code, result)
 
-    while code != POISON_PILL_MSG:
+
+def match_code(code: str) -> Optional[Tuple]:
+    """
+        Runs in a worker process and attempts to decode a single code, first with the strict
+        configuration and then, if no location was found, with the relaxed one.  Returns the output record, or a
+        FAILED_DECODING_MSG record if both attempts failed.
+    """
+    try:
+        result = _RDR.match(code)
+    except LRDecodeError:
+        # no location found with the strict parameters: retry with the relaxed ones
         try:
-            result = rdr.match(code)
-            enqueue(result)
+            result = _RDR.match(code, config=RelaxedConfig)
         except:
+            return (FAILED_DECODING_MSG, None, None, None, None)
+    except:
+        # anything else (i.e. an undecodable code) will not be fixed by relaxing the parameters
+        return (FAILED_DECODING_MSG, None, None, None, None)
+    return build_row(code, result)
+
+
+def match_range(code_range: Tuple[int, int]) -> Tuple[int, int]:
+    """
+        Runs in a worker process and decodes every code in the given byte range of CODES_FN,
+        appending the successful records to the worker's output shard.
+        Returns the (successes, fails) counts of the range.
+    """
+    start, end = code_range
+    successes = 0
+    fails = 0
+    with open(_SHARD_FN, "at") as outf:
+        for line in _CODES[start:end].split(b"\n"):
             try:
-                result = rdr.match(code, config=RelaxedConfig)
-                enqueue(result)
-            except:
-                q_out.put((FAILED_DECODING_MSG, None, None, None, None))
-        code = q_in.get()
-    q_out.put((code, None, None, None, None))
-    logging.info(f"Worker {id} shutting down")
+                code = line.rstrip().decode("ascii")
+            except UnicodeDecodeError:
+                # binary OpenLR codes are base64, so this line cannot be one
+                fails += 1
+                continue
+            if not code:
+                continue
+            row = match_code(code)
+            if row is None:
+                continue
+            (code, coords, lines, p_off, n_off) = row
+            if code != FAILED_DECODING_MSG:
+                # We have a valid geosjon object: write it to the shard
+                outf.write(f"{code}\t{coords}\t{lines}\t{p_off}\t{n_off}\n")
+                successes += 1
+            else:
+                # decoding failure: update counter
+                fails += 1
+    return successes, fails
 
 
 def print_progress(successes, fails, start_time):
@@ -155,62 +244,41 @@ def print_progress(successes, fails, start_time):
     current_time = timeit.default_timer()
     elapsed = current_time - start_time
     attempts = successes + fails
-    print(f"Attempts: {attempts}; Successes: {successes}; Failures: {fails}; Success rate: {100 * (successes/attempts):.2f}%;  Match rate:  ({(attempts / elapsed):.02f} codes/sec)", end='\r')
+    # nothing to report a rate for yet, i.e. when the codes file is empty
+    success_rate = 100 * (successes / attempts) if attempts else 0.0
+    match_rate = attempts / elapsed if elapsed > 0 else 0.0
+    print(f"Attempts: {attempts}; Successes: {successes}; Failures: {fails}; Success rate: {success_rate:.2f}%;  Match rate:  ({match_rate:.02f} codes/sec)", end='\r')
+
+
+def merge_shards(shard_dir: str):
+    """
+        Concatenates the worker output shards into OUTPUT_FN and removes them
+    """
+    with open(OUTPUT_FN, "wb") as outf:
+        for shard_fn in sorted(os.listdir(shard_dir)):
+            with open(os.path.join(shard_dir, shard_fn), "rb") as shard:
+                shutil.copyfileobj(shard, outf)
+    shutil.rmtree(shard_dir)
 
 
 if __name__ == '__main__':
-    workers = []
     ctx = mp.get_context('spawn')
-    # create the worker and writer queues
-    q_in = ctx.Queue(0)
-    q_out = ctx.Queue(0)
-
-    # spawn the loader, passing it the worker queue to fill
-    loader = ctx.Process(target=load_queue, args=(q_in,))
-    loader.start()
-    active_workers = 0
-    responses_received = 0
     start_time = timeit.default_timer()
+    shard_dir = tempfile.mkdtemp(prefix="batch_match.")
 
-    # spawn the workers
-    for i in range(WORKER_COUNT):
-        p = ctx.Process(target=worker, args=(i, q_in, q_out))
-        p.start()
-        workers.append(p)
-        active_workers += 1
-
-    # Create and use an output file context manager
-    with open(OUTPUT_FN, "wt") as outf:
+    # Spawn the workers; each one writes its results to its own shard in shard_dir
+    with ctx.Pool(WORKER_COUNT, initializer=init_worker, initargs=(shard_dir,)) as pool:
         successes = 0
         fails = 0
-        # process as long as there are active workers
-        while active_workers > 0:
-            # get the next GeoSJON object from a worker
-            (code, coords, lines, p_off, n_off) = q_out.get()
-            if code == POISON_PILL_MSG:
-                # Poison pill:  decrement the worker count
-                logging.info("Worker shutdown detected")
-                active_workers -= 1
-            elif code != FAILED_DECODING_MSG:
-                # We have a valid geosjon object: write it to the output file
-                outf.write(f"{code}\t{coords}\t{lines}\t{p_off}\t{n_off}\n")
-                successes += 1
-            else:
-                # decoding failure: update counter
-                fails += 1
-            responses_received += 1
-            if responses_received % 1000 == 0:
-                # periodically update the status message and flush output
-                print_progress(successes, fails, start_time)
-
-        print_progress(successes, fails, start_time)
-        print("\nDone")
-
-    # allow worker processes to terminate
-    for w in workers:
-        w.join()
-
-    # clean up
-    loader.join()
-    q_in.close()
-    q_out.close()
+        # collect the counts in whatever order the workers complete the ranges
+        for (range_successes, range_fails) in pool.imap_unordered(match_range, code_ranges()):
+            successes += range_successes
+            fails += range_fails
+            # update the status message after every completed range
+            print_progress(successes, fails, start_time)
+        pool.close()
+        pool.join()
+
+    merge_shards(shard_dir)
+    print_progress(successes, fails, start_time)
+    print("\nDone")
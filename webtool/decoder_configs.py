@@ -7,28 +7,29 @@ from openlr_dereferencer.decoding import Config
 #: When comparing an LRP FOW with a candidate's FOW, this matrix defines
 #: how well the candidate's FOW fits as replacement for the expected value.
 #: The usage is `fow_standin_score[lrp's fow][candidate's fow]`.
-#: It returns the score.
-STRICT_FOW_STAND_IN_SCORE = [
-    [0.50, 0.50, 0.50, 0.50, 0.50, 0.50, 0.50, 0.1],  # 0 = Undefined FOW
-    [0.50, 1.00, 0.75, 0.25, 0.00, 0.00, 0.00, 0.1],  # 1 = Motorway
-    [0.50, 0.75, 1.00, 0.75, 0.50, 0.00, 0.00, 0.1],  # 2 = Multiple carriage way
-    [0.50, 0.00, 0.75, 1.00, 0.50, 0.50, 0.00, 0.1],  # 3 = Single carriage way
-    [0.50, 0.00, 0.00, 0.50, 1.00, 0.50, 0.00, 0.1],  # 4 = Roundabout
-    [0.50, 0.00, 0.00, 0.50, 0.50, 1.00, 0.00, 0.1],  # 5 = Traffic square
-    [0.50, 0.50, 0.40, 0.30, 0.00, 0.00, 1.00, 0.1],  # 6 = Sliproad
-    [0.50, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 1.0],  # 7 = Other FOW
-]
+#: It returns the score.  The matrices are read-only, so they are stored
+#: as tuples, which index faster than lists.
+STRICT_FOW_STAND_IN_SCORE = (
+    (0.50, 0.50, 0.50, 0.50, 0.50, 0.50, 0.50, 0.1),  # 0 = Undefined FOW
+    (0.50, 1.00, 0.75, 0.25, 0.00, 0.00, 0.00, 0.1),  # 1 = Motorway
+    (0.50, 0.75, 1.00, 0.75, 0.50, 0.00, 0.00, 0.1),  # 2 = Multiple carriage way
+    (0.50, 0.00, 0.75, 1.00, 0.50, 0.50, 0.00, 0.1),  # 3 = Single carriage way
+    (0.50, 0.00, 0.00, 0.50, 1.00, 0.50, 0.00, 0.1),  # 4 = Roundabout
+    (0.50, 0.00, 0.00, 0.50, 0.50, 1.00, 0.00, 0.1),  # 5 = Traffic square
+    (0.50, 0.50, 0.40, 0.30, 0.00, 0.00, 1.00, 0.1),  # 6 = Sliproad
+    (0.50, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 1.0),  # 7 = Other FOW
+)
 
-RELAXED_FOW_STAND_IN_SCORE = [
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 0 = Undefined FOW
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 1 = Motorway
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 2 = Multiple carriage way
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 3 = Single carriage way
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 4 = Roundabout
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 5 = Traffic square
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 6 = Sliproad
-    [1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00],  # 7 = Other FOW
-]
+RELAXED_FOW_STAND_IN_SCORE = (
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 0 = Undefined FOW
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 1 = Motorway
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 2 = Multiple carriage way
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 3 = Single carriage way
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 4 = Roundabout
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 5 = Traffic square
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 6 = Sliproad
+    (1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00, 1.00),  # 7 = Other FOW
+)
 
 # Decoding is first attempted using strict decoding parameters,
 # and then retried with more lenient ones if the first decoding
@@ -2,13 +2,15 @@
 from math import sqrt, atan2, sin, cos
 from typing import Sequence, Tuple, Optional
 
+import numpy as np
 from openlr import Coordinates
 from pyproj import Transformer
-from shapely.geometry import LineString, Point
-from shapely.ops import substring
+from shapely.geometry import LineString
 
 from openlr_dereferencer.maps.abstract import GeoTool
 
+from .geotool_4326 import pairwise
+
 TRAN_4326_TO_3857 = Transformer.from_crs("EPSG:4326", "EPSG:3857", allow_ballpark=False, accuracy=1.0)
 
 
@@ -22,10 +24,23 @@ class GeoTool_3857(GeoTool):
         x, y = self.transform(coord.lat, coord.lon)
         return Coordinates(lon=x, lat=y)
 
+    def transform_coordinates(self, coords: Sequence[Coordinates]) -> np.ndarray:
+        """ Transforms a sequence of WGS84 coordinates into the local CRS with a
+        single call to proj, returning an (N, 2) array of x/y rows """
+        lats = np.fromiter((c.lat for c in coords), dtype=np.float64, count=len(coords))
+        lons = np.fromiter((c.lon for c in coords), dtype=np.float64, count=len(coords))
+        xs, ys = self.transform(lats, lons)
+        return np.column_stack((xs, ys))
+
     def distance(self, point_a: Coordinates, point_b: Coordinates) -> float:
         "Returns the distance of two local coordinates on our planet, in meters"
         return sqrt(((point_a.lon - point_b.lon) ** 2) + ((point_a.lat - point_b.lat) ** 2))
 
+    def distances_to_many(self, point: Coordinates, points: np.ndarray) -> np.ndarray:
+        "Returns the distances, in meters, from `point` to each x/y row of the (N, 2) array `points`"
+        points = np.asarray(points, dtype=np.float64)
+        return np.hypot(points[:, 0] - point.lon, points[:, 1] - point.lat)
+
     def line_string_length(self, line_string: LineString) -> float:
         """Returns the length of a line string in meters"""
         return line_string.length
@@ -36,10 +51,24 @@ class GeoTool_3857(GeoTool):
         The result of this function is between -pi, pi, including them"""
         return atan2(point_b.lon - point_a.lon, point_b.lat - point_a.lat)
 
+    def bearings(self, coords: np.ndarray) -> np.ndarray:
+        """Returns the bearing, as in `bearing`, of every segment of the (N, 2)
+        x/y array `coords`, computed with a single arctan2 call"""
+        coords = np.asarray(coords, dtype=np.float64)
+        return np.arctan2(np.diff(coords[:, 0]), np.diff(coords[:, 1]))
+
     def extrapolate(self, point: Coordinates, dist: float, angle: float) -> Coordinates:
         "Creates a new point that is `dist` meters away in direction `angle`"
         return Coordinates(lon=point.lon + dist * sin(angle), lat=point.lat + dist * cos(angle))
 
+    def extrapolate_many(self, points: np.ndarray, dists, angles) -> np.ndarray:
+        """Extrapolates every x/y row of `points` by the corresponding `dists` meters
+        in direction `angles`, returning an (N, 2) array"""
+        points = np.asarray(points, dtype=np.float64)
+        dists = np.asarray(dists, dtype=np.float64)
+        angles = np.asarray(angles, dtype=np.float64)
+        return np.column_stack((points[:, 0] + dists * np.sin(angles), points[:, 1] + dists * np.cos(angles)))
+
     def interpolate(self, path: Sequence[Coordinates], distance_meters: float) -> Coordinates:
         """Go `distance` meters along the `path` and return the resulting point
 
@@ -48,41 +77,61 @@ class GeoTool_3857(GeoTool):
         if distance_meters <= 0:
             return Coordinates(lon=path[0][0], lat=path[0][1])
 
-        p = LineString(path).interpolate(distance_meters, normalized=False)
-        xs, ys = p.xy
-        return Coordinates(lon=xs[0], lat=ys[0])
+        coords = np.asarray(path, dtype=np.float64)
+        index, t = self._locate(coords, distance_meters)
+        if index is None:
+            return Coordinates(lon=float(coords[-1, 0]), lat=float(coords[-1, 1]))
+        x, y = coords[index] + t * (coords[index + 1] - coords[index])
+        return Coordinates(lon=float(x), lat=float(y))
 
     def split_line(self, line: LineString, meters_into: float) -> Tuple[Optional[LineString], Optional[LineString]]:
         "Splits a line at `meters_into` meters and returns the two parts. A part is None if it would be a Point"
-        a, b = substring(line, 0, meters_into), substring(line, meters_into, line.length)
-        a = None if isinstance(a, Point) else a
-        b = None if isinstance(b, Point) else b
-        return (a, b)
-        # if meters_into == 0.0:
-        #     return (None, line)
-        # else:
-        #     p = line.interpolate(meters_into, normalized=False)
-        #     gc = split(line, p.buffer(.001))
-        #     if len(gc.geoms) > 1:
-        #         return (gc.geoms[0], gc.geoms[1])
-        #     else:
-        #         return (gc.geoms[0], None)
 
-    def join_lines(self, lines: Sequence[LineString]) -> LineString:
-        coords = []
-        last = None
-
-        for l in lines:
-            cs = l.coords
-            first = cs[0]
-
-            if last is None:
-                coords.append(first)
-            else:
-                if first != last:
-                    raise ValueError("Lines are not connected")
+        if meters_into <= 0.0:
+            return (None, line)
+        # compared with the GEOS length: the cumulative sum below can round to slightly
+        # more, which would leave a zero-length tail at the very end of the line
+        if meters_into >= line.length:
+            return (line, None)
+
+        arr = np.asarray(line.coords)
+        index, t = self._locate(arr, meters_into)
+        if index is None:
+            return (line, None)
+        if t == 0.0:
+            return (LineString(arr[0:index + 1]), LineString(arr[index:]))
+        c = arr[index] + t * (arr[index + 1] - arr[index])
+        return (LineString(np.vstack((arr[0:index + 1], c))), LineString(np.vstack((c, arr[index + 1:]))))
+
+    @staticmethod
+    def _locate(coords: np.ndarray, meters_into: float) -> Tuple[Optional[int], float]:
+        """Returns the index of the segment of `coords` in which the point `meters_into`
+        meters along lies, and the fraction of that segment before the point.
+
+        The index is None when the path is not longer than `meters_into`"""
+        seg_lengths = np.hypot(np.diff(coords[:, 0]), np.diff(coords[:, 1]))
+        accum = np.cumsum(seg_lengths)
+        # index of the first segment whose end lies beyond meters_into
+        index = int(np.searchsorted(accum, meters_into, side='right'))
+        if index == len(seg_lengths):
+            return None, 0.0
+        offset = meters_into - (accum[index - 1] if index > 0 else 0.0)
+        return index, float(offset / seg_lengths[index])
 
-            coords.extend(cs[1:])
-            last = cs[-1]
-
-        return LineString(coords)
+    def join_lines(self, lines: Sequence[LineString]) -> LineString:
+        if len(lines) == 0:
+            return LineString()
+
+        arrays = [np.asarray(l.coords) for l in lines]
+        for prev, cur in pairwise(arrays):
+            if not np.array_equal(prev[-1], cur[0]):
+                raise ValueError("Lines are not connected")
+
+        # the first point of every line after the first is the last point of its predecessor
+        out = np.empty((1 + sum(len(a) - 1 for a in arrays), 2))
+        out[0] = arrays[0][0]
+        pos = 1
+        for a in arrays:
+            out[pos:pos + len(a) - 1] = a[1:]
+            pos += len(a) - 1
+        return LineString(out)
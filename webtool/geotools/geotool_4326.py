@@ -1,18 +1,30 @@
 "Some geo coordinates related tools"
 from math import radians, degrees
-from typing import Sequence, Tuple, Optional
+from typing import Sequence, Tuple, Optional, Union
 from openlr import Coordinates
 from shapely.geometry import LineString
-from itertools import tee, accumulate
+import numpy as np
 from openlr_dereferencer.maps.abstract import GeoTool
 from pyproj import Geod
 
 
-def pairwise(iterable):
-    "s -> (s0,s1), (s1,s2), (s2, s3), ..."
-    first, second = tee(iterable)
-    next(second, None)
-    return zip(first, second)
+try:
+    from itertools import pairwise
+except ImportError:  # python < 3.10
+    from itertools import tee
+
+    def pairwise(iterable):
+        "s -> (s0,s1), (s1,s2), (s2, s3), ..."
+        first, second = tee(iterable)
+        next(second, None)
+        return zip(first, second)
+
+
+def as_coordinates(c) -> Coordinates:
+    "Boxes a (lon, lat) pair, i.e. a row of a coordinate array, into Coordinates"
+    if isinstance(c, Coordinates):
+        return c
+    return Coordinates(lon=float(c[0]), lat=float(c[1]))
 
 
 class GeoTool_4326(GeoTool):
@@ -29,7 +41,10 @@ class GeoTool_4326(GeoTool):
 
     def line_string_length(self, line_string: LineString) -> float:
         """Returns the length of a line string in meters"""
-        return self.geod.geometry_length(line_string, radians=False)
+        coords = np.asarray(line_string.coords)
+        if len(coords) < 2:
+            return 0.0
+        return self.geod.line_length(coords[:, 0], coords[:, 1], radians=False)
 
     def bearing(self, point_a: Coordinates, point_b: Coordinates) -> float:
         """Returns the angle between self and other relative to true north
@@ -38,34 +53,48 @@ class GeoTool_4326(GeoTool):
         r, _, _ = self.geod.inv(point_a.lon, point_a.lat, point_b.lon, point_b.lat)
         return radians(r)
 
+    def bearing_batch(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Returns the bearings, in radians, from each lon/lat row of `src` to the
+        corresponding row of `dst`, computed with a single geodesic call"""
+        src = np.asarray(src, dtype=np.float64)
+        dst = np.asarray(dst, dtype=np.float64)
+        az, _, _ = self.geod.inv(src[:, 0], src[:, 1], dst[:, 0], dst[:, 1])
+        return np.radians(az)
+
     def extrapolate(self, point: Coordinates, dist: float, angle: float) -> Coordinates:
-        "Creates a new point that is `dist` meters away in direction `angle` degrees"
-        lon, lat, _ = self.geod.fwd(point.lon, point.lat, degrees(angle), dist)
+        "Creates a new point that is `dist` meters away in direction `angle` radians"
+        return self.extrapolate_deg(point.lon, point.lat, dist, degrees(angle))
+
+    def extrapolate_deg(self, lon: float, lat: float, dist: float, azim: float) -> Coordinates:
+        "Creates a new point that is `dist` meters away from (lon, lat) in direction `azim` degrees"
+        lon, lat, _ = self.geod.fwd(lon, lat, azim, dist)
         return Coordinates(lon=lon, lat=lat)
 
-    def interpolate(self, path: Sequence[Coordinates], meters_into: float) -> Coordinates:
+    def interpolate(self, path: Union[Sequence[Coordinates], np.ndarray], meters_into: float) -> Coordinates:
         """Go `distance` meters along the `path` and return the resulting point
 
+        `path` may also be an (N, 2) array of lon/lat pairs, which avoids
+        creating a Coordinates object per vertex.
+
         When the length of the path is too short, returns its last coordinate"""
 
         if meters_into == 0.0:
-            return path[0]
+            return as_coordinates(path[0])
 
         # one call to proj to retreive the segment lengths and forward azimuths
-        lons1 = [c.lon for c in path[0:-1]]
-        lats1 = [c.lat for c in path[0:-1]]
-        lons2 = [c.lon for c in path[1:]]
-        lats2 = [c.lat for c in path[1:]]
-        fwd_azims, _, dists = self.geod.inv(lons1, lats1, lons2, lats2)
-
-        for index, accum_distance in enumerate(accumulate(dists)):
-            if accum_distance > meters_into:
-                offset = dists[index] - (accum_distance - meters_into)
-                if offset == 0.0:
-                    return path[index]
-                else:
-                    return self.extrapolate(path[index], offset, radians(fwd_azims[index]))
-        return path[-1]
+        coords = np.asarray(path, dtype=np.float64)
+        fwd_azims, _, dists = self.geod.inv(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+        # index of the first segment whose end lies beyond meters_into
+        accum = np.cumsum(dists)
+        index = int(np.searchsorted(accum, meters_into, side='right'))
+        if index == len(dists):
+            return as_coordinates(path[-1])
+        offset = float(dists[index] - (accum[index] - meters_into))
+        if offset == 0.0:
+            return as_coordinates(path[index])
+        else:
+            return self.extrapolate_deg(coords[index, 0], coords[index, 1], offset, fwd_azims[index])
 
     def split_line(self, line: LineString, meters_into: float) -> Tuple[Optional[LineString], Optional[LineString]]:
         "Splits a line at `meters_into` meters and returns the two parts. A part is None if it would be a Point"
@@ -73,41 +102,30 @@ class GeoTool_4326(GeoTool):
         if meters_into == 0.0:
             return (None, line)
 
-        coords = line.coords
         # one call to proj to retreive the segment lengths and forward azimuths
-        lons1 = [c[0] for c in coords[0:-1]]
-        lats1 = [c[1] for c in coords[0:-1]]
-        lons2 = [c[0] for c in coords[1:]]
-        lats2 = [c[1] for c in coords[1:]]
-        fwd_azims, _, dists = self.geod.inv(lons1, lats1, lons2, lats2)
-
-        for index, accum_distance in enumerate(accumulate(dists)):
-            if accum_distance > meters_into:
-                offset = dists[index] - (accum_distance - meters_into)
-                if offset == 0.0:
-                    return (LineString(coords[0:index + 1]), LineString(coords[index:]))
-                else:
-                    c = self.extrapolate(Coordinates(lon=coords[index][0], lat=coords[index][1]), offset,
-                                         radians(fwd_azims[index]))
-                    return (LineString(coords[0:index + 1] + [c]), LineString([c] + coords[index + 1:]))
-
-        return (line, None)
+        arr = np.asarray(line.coords)
+        fwd_azims, _, dists = self.geod.inv(arr[:-1, 0], arr[:-1, 1], arr[1:, 0], arr[1:, 1])
+
+        # index of the first segment whose end lies beyond meters_into
+        accum = np.cumsum(dists)
+        index = int(np.searchsorted(accum, meters_into, side='right'))
+        if index == len(dists):
+            return (line, None)
+        offset = float(dists[index] - (accum[index] - meters_into))
+        if offset == 0.0:
+            return (LineString(arr[0:index + 1]), LineString(arr[index:]))
+        else:
+            c = np.array([self.extrapolate_deg(arr[index, 0], arr[index, 1], offset, fwd_azims[index])])
+            return (LineString(np.vstack((arr[0:index + 1], c))), LineString(np.vstack((c, arr[index + 1:]))))
 
     def join_lines(self, lines: Sequence[LineString]) -> LineString:
-        coords = []
-        last = None
-
-        for l in lines:
-            cs = l.coords
-            first = cs[0]
-
-            if last is None:
-                coords.append(first)
-            else:
-                if first != last:
-                    raise ValueError("Lines are not connected")
+        if len(lines) == 0:
+            return LineString()
 
-            coords.extend(cs[1:])
-            last = cs[-1]
+        arrays = [np.asarray(l.coords) for l in lines]
+        for prev, cur in pairwise(arrays):
+            if not np.array_equal(prev[-1], cur[0]):
+                raise ValueError("Lines are not connected")
 
-        return LineString(coords)
+        # the first point of every line after the first is the last point of its predecessor
+        return LineString(np.concatenate([arrays[0]] + [a[1:] for a in arrays[1:]]))
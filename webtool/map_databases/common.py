@@ -0,0 +1,71 @@
+"""
+Helpers shared by the map readers in this package.
+
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from math import cos, radians
+from typing import Optional, Tuple
+
+from openlr import binary_decode, FOW, FRC
+
+# FOW/FRC members indexed by their integer value: indexing a tuple is much cheaper
+# than calling the IntEnum constructor for every row read from the DB
+FOW_LUT = tuple(FOW(i) for i in range(len(FOW)))
+FRC_LUT = tuple(FRC(i) for i in range(len(FRC)))
+# Lower bounds of the WGS84 length of one degree of latitude (at the equator) and of one
+# degree of longitude (divided by cos(lat)), so that search frames built from them never
+# come out smaller than the requested radius
+METERS_PER_DEG_LAT = 110574.0
+METERS_PER_DEG_LON = 111319.49
+
+
+def search_frame(lon: float, lat: float, dist: float) -> Tuple[float, float, float, float]:
+    """
+    Returns a (min_lon, min_lat, max_lon, max_lat) box containing every point within
+    `dist` meters of (lon, lat), using an equirectangular approximation.  This is only
+    used to pre-filter candidates from the spatial index, so it errs on the large side.
+    """
+    dlat = dist / METERS_PER_DEG_LAT
+    dlon = dist / (METERS_PER_DEG_LON * max(cos(radians(lat)), 1e-6))
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+@lru_cache(maxsize=4096)
+def _cached_binary_decode(binstr: str):
+    return binary_decode(binstr)
+
+
+def decode_ref(binstr: str):
+    """
+    Returns the location reference encoded in `binstr`.  Parsing results are cached,
+    since the same codes are often matched repeatedly (i.e. with different configs).
+    The list of points is copied so that callers cannot alter the cached reference.
+    """
+    ref = _cached_binary_decode(binstr)
+    points = getattr(ref, "points", None)
+    return ref if points is None else ref._replace(points=list(points))
+
+
+class LRUCache(OrderedDict):
+    """
+    Dictionary holding at most `maxsize` entries (unbounded if None).  When full,
+    inserting a new entry evicts the entry that was least recently inserted or
+    read with get().
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self.maxsize is not None and len(self) > self.maxsize:
+            self.popitem(last=False)
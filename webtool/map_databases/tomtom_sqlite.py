@@ -19,27 +19,30 @@ from __future__ import annotations
 
 import logging
 from contextlib import closing
-from itertools import chain
-from math import sqrt
 from sqlite3 import connect
-from typing import Iterable, Optional, cast, Dict
+from sys import intern
+from typing import Iterable, List, Optional, Tuple, cast, Dict
 
 # import param
 from openlr import Coordinates, FOW
-from openlr import binary_decode, FRC
+from openlr import FRC
 from pyproj import Geod
+import shapely
 from shapely import wkb
 from shapely.geometry import LineString, Point, Polygon
-from shapely.ops import nearest_points
 
 from openlr_dereferencer import decode, Config
 from openlr_dereferencer.decoding import MapObjects, DEFAULT_CONFIG
 from openlr_dereferencer.maps import Line as AbstractLine, Node as AbstractNode
 from openlr_dereferencer.maps import MapReader
 from openlr_dereferencer.maps.abstract import GeoTool
+from .common import FOW_LUT, FRC_LUT, LRUCache, decode_ref, search_frame
 
 GEOD = Geod(ellps="WGS84")
-SQRT_2 = sqrt(2)
+# Maximum number of ids in one "id in (...)" node query
+NODE_BATCH_SIZE = 500
+# Number of rows fetched at a time by the full-table scans of get_lines()/get_nodes()
+FETCH_SIZE = 1024
 
 
 class WebToolMapException(Exception):
@@ -62,10 +65,7 @@ def are_peers(candidate: Line, source: Optional[Line]) -> bool:
         bool
             True if candidate and source are peer lines, False otherwise
     """
-    if source is None:
-        return False
-    else:
-        return candidate.line_id == "-" + source.line_id or source.line_id == "-" + candidate.line_id
+    return source is not None and candidate.peer_id == source.line_id
 
 
 class Line(AbstractLine):
@@ -98,15 +98,21 @@ class Line(AbstractLine):
             shapely LineString representing this line's geometry
     """
 
+    __slots__ = ("id", "peer_id", "map_reader", "_fow", "_frc", "_length", "from_int", "to_int", "_geometry")
+
     def __init__(self, map_reader: TomTomMapReaderSQLite, line_id: str, fow: FOW, frc: FRC, length: float,
                  from_int: str | Node, to_int: str | Node, geometry: LineString):
-        self.id: str = line_id
+        # ids are interned, since the same few strings are hashed and compared
+        # over and over as cache keys while the decoder walks the graph
+        self.id: str = intern(line_id)
+        # id of the same road in the opposite direction
+        self.peer_id: str = intern(line_id[1:] if line_id.startswith("-") else "-" + line_id)
         self.map_reader: TomTomMapReaderSQLite = map_reader
         self._fow: FOW = fow
         self._frc: FRC = frc
         self._length: float = length
-        self.from_int: str | Node = from_int
-        self.to_int: str | Node = to_int
+        self.from_int: str | Node = from_int if isinstance(from_int, Node) else intern(from_int)
+        self.to_int: str | Node = to_int if isinstance(to_int, Node) else intern(to_int)
         self._geometry: LineString = geometry
 
     def __repr__(self):
@@ -151,7 +157,10 @@ class Line(AbstractLine):
 
     def distance_to(self, coord) -> float:
         """Returns the distance of this line to `coord` in meters"""
-        return GEOD.geometry_length(LineString(nearest_points(self._geometry, Point(coord.lon, coord.lat))))
+        # one GEOS call for the closest point on the line, then one geodesic inverse
+        ((lon1, lat1), (lon2, lat2)) = shapely.shortest_line(self._geometry, Point(coord.lon, coord.lat)).coords
+        _, _, dist = GEOD.inv(lon1, lat1, lon2, lat2)
+        return dist
 
 
 class Node(AbstractNode):
@@ -171,13 +180,17 @@ class Node(AbstractNode):
             WGS84 latitude of this node's point
     """
 
+    __slots__ = ("lon", "lat", "map_reader", "id", "incoming_lines_cache", "outgoing_lines_cache")
+
     def __init__(self, map_reader: TomTomMapReaderSQLite, node_id: str, lon: float, lat: float):
         self.lon = lon
         self.lat = lat
         self.map_reader = map_reader
-        self.id = node_id
-        self.incoming_lines_cache = []
-        self.outgoing_lines_cache = []
+        self.id = intern(node_id)
+        # None until the lines have been fetched from the DB.  The caches hold every
+        # incoming/outgoing line; peers of the source line are filtered per call.
+        self.incoming_lines_cache: Optional[List[Line]] = None
+        self.outgoing_lines_cache: Optional[List[Line]] = None
 
     @property
     def node_id(self):
@@ -187,54 +200,54 @@ class Node(AbstractNode):
     def coordinates(self) -> Coordinates:
         return Coordinates(lon=self.lon, lat=self.lat)
 
+    def _fetch_connected(self):
+        # One query returns every physical line touching this node.  Each row produces
+        # the line as digitized and/or, for two-way lines, its reversal, and each of
+        # those is outgoing if it starts here and incoming if it ends here.
+        incoming = []
+        outgoing = []
+        rdr = self.map_reader
+        rows = rdr.connection.execute(rdr.connected_lines_query, (self.node_id, self.node_id)).fetchall()
+        # decode all geometries in one vectorized call, and fetch the nodes at the
+        # other ends of the lines in one query
+        geoms = shapely.from_wkb([row[7] for row in rows])
+        nodes = rdr.get_nodes_by_ids([row[6] if row[5] == self.id else row[5] for row in rows])
+        nodes[self.id] = self
+        for (line_id, fow, direction, frc, length, start_id, end_id, _), geom in zip(rows, geoms):
+            start = nodes.get(start_id, start_id)
+            end = nodes.get(end_id, end_id)
+            line = rdr._line_from_row(line_id, fow, frc, length, start, end, geom, False)
+            if start is self:
+                outgoing.append(line)
+            if end is self:
+                incoming.append(line)
+            if direction == 1:
+                line = rdr._line_from_row(line_id, fow, frc, length, end, start, geom, True)
+                if end is self:
+                    outgoing.append(line)
+                if start is self:
+                    incoming.append(line)
+        self.incoming_lines_cache = incoming
+        self.outgoing_lines_cache = outgoing
+
     def outgoing_lines(self, source: Optional[Line] = None) -> Iterable[Line]:
-        if len(self.outgoing_lines_cache) > 0:
-            for line in self.outgoing_lines_cache:
-                yield line
-        else:
-            with closing(self.map_reader.connection.cursor()) as cursor:
-                # start_time = time()
-                cursor.execute(self.map_reader.outgoing_lines_query, (self.node_id, self.node_id))
-                # end_time = time();
-                # print(f"Outgoing lines query: {end_time - start_time}")
-                for (line_id, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                    line = self.map_reader.line_cache.get(line_id)
-                    if line is not None and not are_peers(line, source):
-                        self.outgoing_lines_cache.append(line)
-                        yield line
-                    else:
-                        ls = LineString(wkb.loads(geom, hex=False))
-                        line = Line(self.map_reader, line_id, FOW(fow), FRC(frc), length, self, to_int, ls)
-                        self.map_reader.line_cache[line_id] = line
-                        if not are_peers(line, source):
-                            self.outgoing_lines_cache.append(line)
-                            yield line
+        if self.outgoing_lines_cache is None:
+            self._fetch_connected()
+        if source is None:
+            return self.outgoing_lines_cache
+        return [line for line in self.outgoing_lines_cache if not are_peers(line, source)]
 
     def incoming_lines(self, source: Optional[Line] = None) -> Iterable[Line]:
-        if len(self.incoming_lines_cache) > 0:
-            for line in self.incoming_lines_cache:
-                yield line
-        else:
-            with closing(self.map_reader.connection.cursor()) as cursor:
-                # start_time = time()
-                cursor.execute(self.map_reader.incoming_lines_query, (self.node_id, self.node_id))
-                # end_time = time();
-                # print(f"Incoming lines query: {end_time - start_time}")
-                for (line_id, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                    line = self.map_reader.line_cache.get(line_id)
-                    if line is not None and not are_peers(line, source):
-                        self.incoming_lines_cache.append(line)
-                        yield line
-                    else:
-                        ls = LineString(wkb.loads(geom, hex=False))
-                        line = Line(self.map_reader, line_id, FOW(fow), FRC(frc), length, from_int, self, ls)
-                        self.map_reader.line_cache[line_id] = line
-                        if line is not None and not are_peers(line, source):
-                            self.incoming_lines_cache.append(line)
-                            yield line
+        if self.incoming_lines_cache is None:
+            self._fetch_connected()
+        if source is None:
+            return self.incoming_lines_cache
+        return [line for line in self.incoming_lines_cache if not are_peers(line, source)]
 
     def connected_lines(self) -> Iterable[Line]:
-        return chain(self.incoming_lines(), self.outgoing_lines())
+        if self.incoming_lines_cache is None:
+            self._fetch_connected()
+        return self.incoming_lines_cache + self.outgoing_lines_cache
 
 
 
@@ -266,6 +279,17 @@ class TomTomMapReaderSQLite(MapReader):
             A Config object containing default match parameters
             which will be used by the match() method if no config
             is supplied in the call.
+        max_cache_size:Optional[int]
+            Maximum number of entries in each of the node and line
+            caches.  Least recently used entries are evicted beyond
+            that, which bounds memory use when matching many codes with
+            clear_cache=False.  None means unbounded.
+            Default: None
+        prewarm_spatial_index:bool
+            Read the R-tree spatial indexes of both tables once when the
+            reader is created, so that the spatial queries made while
+            decoding find their index pages in SQLite's page cache.
+            Default: False
 
     Example usage:
 
@@ -299,7 +323,8 @@ class TomTomMapReaderSQLite(MapReader):
     """
 
     def __init__(self, db_filename: str, geo_tool: GeoTool, mod_spatialite: str = "mod_spatialite",
-                 lines_table: str = "line", nodes_table: str = "nodes", config: Config = DEFAULT_CONFIG):
+                 lines_table: str = "line", nodes_table: str = "nodes", config: Config = DEFAULT_CONFIG,
+                 prewarm_spatial_index: bool = False, max_cache_size: Optional[int] = None):
 
         self.db_filename = db_filename
         self.geo_tool = geo_tool
@@ -307,16 +332,23 @@ class TomTomMapReaderSQLite(MapReader):
         self.lines_table = lines_table
         self.nodes_table = nodes_table
         self.config = config
-        self.node_cache = {}
-        self.line_cache = {}
+        self.node_cache = LRUCache(max_cache_size)
+        self.line_cache = LRUCache(max_cache_size)
+        self.map_bounds: Optional[Polygon] = None
+        # set by preload(): the whole map is held in node_cache/line_cache, and
+        # line_tree indexes the geometries of line_tree_lines, which holds for
+        # each physical line the Line objects built from it (one or two)
+        self.preloaded = False
+        self.line_tree: Optional[shapely.STRtree] = None
+        self.line_tree_lines: List[Tuple[Line, ...]] = []
+        # Two-way lines (direction = 1) are stored once.  Their reversed twins are
+        # built in Python from the same row, see _line_from_row()
         self.line_query_select = "select id,fow,direction,frc,length,start_id as from_int,end_id as to_int,st_asbinary(geom) as geom"
-        self.rev_line_query_select = "select ('-' || id),fow,direction,frc,length,end_id as from_int,start_id as to_int,st_asbinary(st_reverse(geom)) as geom"
         self.node_query_select = "select id,st_x(geom),st_y(geom)"
         self.line_query = self.line_query_select + f" from {self.lines_table}"
-        self.rev_line_query = self.rev_line_query_select + f" from {self.lines_table}"
         self.node_query = self.node_query_select + f" from {self.nodes_table}"
         self.get_line_query = self.line_query + " where id=?"
-        self.get_lines_query = self.line_query + " union " + self.rev_line_query + " where direction = 1"
+        self.get_lines_query = self.line_query
         self.get_linecount_query = f"select count(1) from {self.lines_table}"
         self.get_node_query = self.node_query + " where id=?"
         self.get_nodes_query = self.node_query
@@ -339,21 +371,74 @@ class TomTomMapReaderSQLite(MapReader):
                     distance(r.geom,(select p from tgt),1) <= ?
             )
         {self.line_query_select} from candidates c
-        union 
-        {self.rev_line_query_select} from candidates c where c.direction = 1
         """
-        self.outgoing_lines_query = self.line_query + " where from_int = ? union " + self.rev_line_query + " where from_int = ? and direction = 1"
-        self.incoming_lines_query = self.line_query + " where to_int = ? union " + self.rev_line_query + " where to_int = ? and direction = 1"
-
-        self.connection = connect(f"file:{self.db_filename}?mode=ro", uri=True)
+        self.connected_lines_query = self.line_query + " where start_id = ? or end_id = ?"
+
+        # The query strings are fixed per reader, so sqlite3's per-connection statement
+        # cache hands back the already compiled statements on every execute()
+        self.connection = connect(f"file:{self.db_filename}?mode=ro", uri=True, cached_statements=256)
+        # The reader only ever queries the DB: keep temporary b-trees in memory,
+        # use a 256MB page cache and memory-map up to 1GB of the file
+        self.connection.executescript("""
+            PRAGMA query_only=1;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-262144;
+            PRAGMA mmap_size=1073741824;
+        """)
         self.connection.enable_load_extension(True)
         _ = self.connection.execute(f"""select load_extension("{self.mod_spatialite}")""").fetchall()
+        if prewarm_spatial_index:
+            for table in (self.lines_table, self.nodes_table):
+                _ = self.connection.execute(f"select count(*) from idx_{table}_geom").fetchone()
 
     def get_map_bounds(self) -> Polygon:
+        # the extent query scans the whole lines table, and the map does not change
+        # while the reader is open, so the result is computed only once
+        if self.map_bounds is None:
+            with closing(self.connection.cursor()) as cursor:
+                cursor.execute(f"select st_asbinary(extent(geom)) from {self.lines_table}")
+                (bounds,) = cursor.fetchone()
+                self.map_bounds = wkb.loads(bounds, hex=False)
+        return self.map_bounds
+
+    def preload(self):
+        """
+        Loads every node and line of the map into memory, together with the
+        incoming and outgoing lines of each node.  Afterwards, walking the
+        graph during decoding no longer queries the DB, and the caches are
+        kept across calls to match().  Only use this if the map fits in memory.
+        Any max_cache_size bound is lifted, and find_lines_close_to uses an
+        in-memory STRtree instead of the Spatialite index.
+        """
+        self.node_cache.maxsize = None
+        self.line_cache.maxsize = None
         with closing(self.connection.cursor()) as cursor:
-            cursor.execute(f"select st_asbinary(extent(geom)) from {self.lines_table}")
-            (bounds,) = cursor.fetchone()
-            return wkb.loads(bounds, hex=False)
+            cursor.execute(self.get_nodes_query)
+            for (node_id, lon, lat) in cursor:
+                n = Node(self, node_id, lon, lat)
+                n.incoming_lines_cache = []
+                n.outgoing_lines_cache = []
+                self.node_cache[n.id] = n
+            cursor.execute(self.get_lines_query)
+            rows = cursor.fetchall()
+        geoms = shapely.from_wkb([row[7] for row in rows])
+        self.line_tree_lines = []
+        for (line_id, fow, direction, frc, length, from_int, to_int, _), ls in zip(rows, geoms):
+            start = self.node_cache[from_int]
+            end = self.node_cache[to_int]
+            line = self._line_from_row(line_id, fow, frc, length, start, end, ls, False)
+            start.outgoing_lines_cache.append(line)
+            end.incoming_lines_cache.append(line)
+            if direction == 1:
+                rev_line = self._line_from_row(line_id, fow, frc, length, end, start, ls, True)
+                end.outgoing_lines_cache.append(rev_line)
+                start.incoming_lines_cache.append(rev_line)
+                self.line_tree_lines.append((line, rev_line))
+            else:
+                self.line_tree_lines.append((line,))
+        # in-memory R-tree, so that find_lines_close_to does not need the DB either
+        self.line_tree = shapely.STRtree(geoms)
+        self.preloaded = True
 
     def match(self, binstr: str, clear_cache: bool = True, config: Optional[Config] = None) -> Optional[MapObjects]:
         """
@@ -363,7 +448,8 @@ class TomTomMapReaderSQLite(MapReader):
             binstr:str
                 binary-encoded OpenLR string (i.e. "C7xSuRUHaAEcKfncBo4BKx8=")
             clear_cache:bool
-                whether to clear the internal line and node cache before matching
+                whether to clear the internal line and node cache before matching.
+                Ignored once the map has been preloaded.
                 Default: True
             config:Optional[Config]
                 configuration object which overrides instance level config
@@ -380,8 +466,8 @@ class TomTomMapReaderSQLite(MapReader):
         if config is None:
             config = self.config
 
-        ref = binary_decode(binstr)
-        if clear_cache:
+        ref = decode_ref(binstr)
+        if clear_cache and not self.preloaded:
             self.node_cache.clear()
             self.line_cache.clear()
         try:
@@ -392,6 +478,23 @@ class TomTomMapReaderSQLite(MapReader):
             logging.info(f"Error during decode of {ref}: {e}")
             return None
 
+    def _line_from_row(self, line_id: str, fow: int, frc: int, length: float, from_int: str | Node,
+                       to_int: str | Node, geom: LineString, reverse: bool) -> Line:
+        """
+        Returns the cached Line for a row of the lines table, creating it if needed.
+        If `reverse` is set, this is the reversed twin of the digitized line: its id
+        is prefixed with "-" and its geometry is reversed.  `from_int` and `to_int`
+        must already be given in the direction of travel.
+        """
+        if reverse:
+            line_id = "-" + line_id
+        line = self.line_cache.get(line_id)
+        if line is None:
+            line = Line(self, line_id, FOW_LUT[fow], FRC_LUT[frc], length, from_int, to_int,
+                        geom.reverse() if reverse else geom)
+            self.line_cache[line.id] = line
+        return line
+
     def get_line(self, line_id: str) -> Line:
         # Just verify that this line ID exists.
         line = self.line_cache.get(line_id)
@@ -405,15 +508,15 @@ class TomTomMapReaderSQLite(MapReader):
             cursor.execute(self.get_lines_query)
             # end_time = time();
             # print(f"get_lines query: {end_time - start_time}")
-            for (line_id, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                line = self.line_cache.get(line_id)
-                if line is not None:
-                    yield line
-                else:
-                    ls = LineString(wkb.loads(geom, hex=False))
-                    line = Line(self, line_id, FOW(fow), FRC(frc), length, from_int, to_int, ls)
-                    self.line_cache[line_id] = line
-                    yield line
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                geoms = shapely.from_wkb([row[7] for row in rows])
+                for (line_id, fow, direction, frc, length, from_int, to_int, _), ls in zip(rows, geoms):
+                    yield self._line_from_row(line_id, fow, frc, length, from_int, to_int, ls, False)
+                    if direction == 1:
+                        yield self._line_from_row(line_id, fow, frc, length, to_int, from_int, ls, True)
 
     def get_linecount(self) -> int:
         with closing(self.connection.cursor()) as cursor:
@@ -431,18 +534,36 @@ class TomTomMapReaderSQLite(MapReader):
         n = self.node_cache.get(node_id)
         if n is not None:
             return n
-        with closing(self.connection.cursor()) as cursor:
-            # start_time = time()
-            cursor.execute(self.get_node_query, (node_id,))
-            # end_time = time();
-            # print(f"Get node query: {end_time - start_time}")
-            res = cursor.fetchone()
-            if res is None:
-                raise WebToolMapException(f"Error retrieving node {node_id} from datastore")
-            (node_id, lon, lat) = res
-            n = Node(self, node_id, lon, lat)
-            self.node_cache[node_id] = n
-            return n
+        res = self.connection.execute(self.get_node_query, (node_id,)).fetchone()
+        if res is None:
+            raise WebToolMapException(f"Error retrieving node {node_id} from datastore")
+        (node_id, lon, lat) = res
+        n = Node(self, node_id, lon, lat)
+        self.node_cache[n.id] = n
+        return n
+
+    def get_nodes_by_ids(self, node_ids: Iterable[str]) -> Dict[str, Node]:
+        """
+        Returns the nodes with the given ids, keyed by id.  Nodes that are not cached
+        yet are fetched with as few queries as possible.  Unknown ids are omitted.
+        """
+        nodes = {}
+        missing = []
+        for node_id in set(node_ids):
+            n = self.node_cache.get(node_id)
+            if n is not None:
+                nodes[node_id] = n
+            else:
+                missing.append(node_id)
+        # stay well below SQLite's limit on the number of host parameters
+        for i in range(0, len(missing), NODE_BATCH_SIZE):
+            chunk = missing[i:i + NODE_BATCH_SIZE]
+            query = self.node_query + f" where id in ({','.join('?' * len(chunk))})"
+            for (node_id, lon, lat) in self.connection.execute(query, chunk):
+                n = Node(self, node_id, lon, lat)
+                self.node_cache[n.id] = n
+                nodes[n.id] = n
+        return nodes
 
     def get_nodes(self) -> Iterable[Node]:
         with closing(self.connection.cursor()) as cursor:
@@ -450,14 +571,18 @@ class TomTomMapReaderSQLite(MapReader):
             cursor.execute(self.get_nodes_query)
             # end_time = time();
             # print(f"Get nodes query: {end_time - start_time}")
-            for (node_id, lon, lat) in cursor:
-                n = self.node_cache.get(node_id)
-                if n is not None:
-                    yield n
-                else:
-                    n = Node(self, node_id, lon, lat)
-                    self.node_cache[node_id] = n
-                    yield n
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for (node_id, lon, lat) in rows:
+                    n = self.node_cache.get(node_id)
+                    if n is not None:
+                        yield n
+                    else:
+                        n = Node(self, node_id, lon, lat)
+                        self.node_cache[n.id] = n
+                        yield n
 
     def get_nodecount(self) -> int:
         with closing(self.connection.cursor()) as cursor:
@@ -475,39 +600,34 @@ class TomTomMapReaderSQLite(MapReader):
         """Finds all nodes in a given radius, given in meters
         Yields every node within this distance to `coord`."""
         lon, lat = coord.lon, coord.lat
-        r = dist * SQRT_2
-        lons, lats, _ = GEOD.fwd(lons=[lon, lon], lats=[lat, lat], az=[225, 45], dist=[r, r], radians=False)
-        with closing(self.connection.cursor()) as cursor:
-            # start_time = time()
-            cursor.execute(self.find_nodes_close_to_query, (lon, lat, lons[0], lats[0], lons[1], lats[1], dist))
-            # end_time = time();
-            # print(f"find_nodes_close_to query: {end_time - start_time}")
-            # nodes = cursor.fetchall()
-            for (node_id, lon, lat) in cursor:
-                n = self.node_cache.get(node_id)
-                if n is not None:
-                    yield n
-                else:
-                    n = Node(self, node_id, lon, lat)
-                    self.node_cache[node_id] = n
-                    yield n
+        min_lon, min_lat, max_lon, max_lat = search_frame(lon, lat, dist)
+        cursor = self.connection.execute(self.find_nodes_close_to_query,
+                                         (lon, lat, min_lon, min_lat, max_lon, max_lat, dist))
+        for (node_id, lon, lat) in cursor:
+            n = self.node_cache.get(node_id)
+            if n is not None:
+                yield n
+            else:
+                n = Node(self, node_id, lon, lat)
+                self.node_cache[n.id] = n
+                yield n
 
     def find_lines_close_to(self, coord: Coordinates, dist: float) -> Iterable[Line]:
         """Yields all lines within `dist` meters around `coord`"""
         lon, lat = coord.lon, coord.lat
-        r = dist * SQRT_2
-        lons, lats, _ = GEOD.fwd(lons=[lon, lon], lats=[lat, lat], az=[225, 45], dist=[r, r], radians=False)
-        with closing(self.connection.cursor()) as cursor:
-            # start_time=time()
-            cursor.execute(self.find_lines_close_to_query, (lon, lat, lons[0], lats[0], lons[1], lats[1], dist))
-            # end_time = time();
-            # print(f"find_lines_close_to query: {end_time - start_time}")
-            for (line_id, fow, _, frc, length, from_int, to_int, geom) in cursor:
-                line = self.line_cache.get(line_id)
-                if line is not None:
-                    yield line
-                else:
-                    ls = LineString(wkb.loads(geom, hex=False))
-                    line = Line(self, line_id, FOW(fow), FRC(frc), length, from_int, to_int, ls)
-                    self.line_cache[line_id] = line
-                    yield line
+        min_lon, min_lat, max_lon, max_lat = search_frame(lon, lat, dist)
+        if self.line_tree is not None:
+            # preloaded map: bounding box search in memory, then the exact distance test
+            for index in self.line_tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat)):
+                lines = self.line_tree_lines[index]
+                if lines[0].distance_to(coord) <= dist:
+                    yield from lines
+            return
+        rows = self.connection.execute(self.find_lines_close_to_query,
+                                       (lon, lat, min_lon, min_lat, max_lon, max_lat, dist)).fetchall()
+        # decode all geometries in one vectorized call
+        geoms = shapely.from_wkb([row[7] for row in rows])
+        for (line_id, fow, direction, frc, length, from_int, to_int, _), ls in zip(rows, geoms):
+            yield self._line_from_row(line_id, fow, frc, length, from_int, to_int, ls, False)
+            if direction == 1:
+                yield self._line_from_row(line_id, fow, frc, length, to_int, from_int, ls, True)
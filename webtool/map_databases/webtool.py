@@ -18,38 +18,69 @@ Dependencies:
 
 from __future__ import annotations
 
+import csv
+from contextlib import closing
+from io import StringIO
 from itertools import chain
-from typing import Iterable, Optional, cast, Dict
+from sys import intern
+from typing import Iterable, List, Optional, Sequence, Tuple, cast, Dict
+from uuid import uuid4
 
 import psycopg2 as pg
+import shapely
 from openlr import Coordinates, FOW
 from openlr import binary_decode, FRC
 from psycopg2 import sql
 from pyproj import Geod
-from shapely import wkb
 from shapely.geometry import LineString, Point
-from shapely.ops import nearest_points
 
 from openlr_dereferencer import decode, Config
 from openlr_dereferencer.decoding import MapObjects, DEFAULT_CONFIG
 from openlr_dereferencer.maps import Line as AbstractLine, Node as AbstractNode
 from openlr_dereferencer.maps import MapReader
 from openlr_dereferencer.maps.abstract import GeoTool
+from .common import FOW_LUT, FRC_LUT, LRUCache, search_frame
 
 GEOD = Geod(ellps="WGS84")
 
-LINE_QUERY_SELECT = "select id,meta,fow,flowdir,frc,len,from_int,to_int,geom"
-REV_LINE_QUERY_SELECT = "select -id,meta,fow,flowdir,frc,len,to_int as from_int,from_int as to_int,st_reverse(geom)"
+# When prefetching, the bounding box of the LRPs is grown by this multiple of
+# the search radius
+PREFETCH_RADIUS_FACTOR = 4
+
+# Geometries are requested as binary WKB, which is half the size of the default hex
+# EWKB text and is parsed without a hex decoding step
+LINE_QUERY_SELECT = "select id,meta,fow,flowdir,frc,len,from_int,to_int,st_asbinary(geom)"
 NODE_QUERY_SELECT = "select id,st_x(geom),st_y(geom)"
 LINE_QUERY = LINE_QUERY_SELECT + " from {schema}.{table}"
-REV_LINE_QUERY = REV_LINE_QUERY_SELECT + " from {schema}.{table}"
 NODE_QUERY = NODE_QUERY_SELECT + " from {schema}.{table}"
+# Radius filter and nearest-first ordering appended to the radius searches.
+# The && against the buffer's box is answered by the GiST index on geom;
+# ST_DWithin on geography then drops the box corners that lie outside the radius.
+# Parameters: {"lon", "lat", "dist", "limit"}
+KNN_4326_FILTER = (" where geom && st_buffer(ST_GeographyFromText('SRID=4326;POINT(%(lon)s %(lat)s)'),"
+                   " %(dist)s)::geometry"
+                   " and ST_DWithin(geom::geography, ST_GeographyFromText('SRID=4326;POINT(%(lon)s %(lat)s)'),"
+                   " %(dist)s)"
+                   " order by geom <-> ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326) limit %(limit)s")
 
 
 class WebToolMapException(Exception):
     pass
 
 
+def node_id_of(node: int | Node) -> int:
+    """Returns the id of a line end point, which is either a node id or a resolved Node"""
+    return node.id if isinstance(node, Node) else node
+
+
+def parse_geometries(rows) -> Sequence[LineString]:
+    """
+    Parses the binary WKB geometries in the last column of the line query `rows`
+    with a single vectorized shapely call
+    """
+    return shapely.from_wkb([bytes(row[-1]) for row in rows])
+
+
 class Line(AbstractLine):
     """
     Line class implementation for the PostgreSQL-based OpenLR webtool. Unlike
@@ -83,10 +114,13 @@ class Line(AbstractLine):
             shapely LineString representing this line's geometry
     """
 
+    __slots__ = ("id", "_meta", "map_reader", "_fow", "_frc", "_length", "from_int", "to_int", "_geometry")
+
     def __init__(self, map_reader: WebToolMapReader, line_id: int, meta: str, fow: FOW, frc: FRC, length: float,
                  from_int: int | Node, to_int: int | Node, geometry: LineString):
         self.id = line_id
-        self._meta = meta
+        # meta values come from a small domain: share one string object per value
+        self._meta = intern(meta) if meta is not None else None
         self.map_reader = map_reader
         self._fow: FOW = fow
         self._frc: FRC = frc
@@ -142,15 +176,19 @@ class Line(AbstractLine):
         return self._geometry
 
     def distance_to(self, coord) -> float:
-        "Returns the distance of this line to `coord` in meters"
-        return GEOD.geometry_length(LineString(nearest_points(self._geometry, Point(coord.lon, coord.lat))))
+        """
+        Returns the distance of this line to `coord` in meters, measured by the reader's
+        geo tool from `coord` to the closest point on the line
+        """
+        foot = self._geometry.interpolate(self._geometry.project(Point(coord.lon, coord.lat)))
+        return self.map_reader.geo_tool.distance(coord, Coordinates(lon=foot.x, lat=foot.y))
 
 
 class Node(AbstractNode):
     """
     Node class implementation for the PostgreSQL-based OpenLR webtool.  Incoming
     and outgoing lines are cached internally once they are discovered as an
-    optimization
+    optimization.  The caches stay None until the lines are first requested.
 
     Arguments:
         map_reader:WebToolMapReader
@@ -163,13 +201,15 @@ class Node(AbstractNode):
             WGS84 latitude of this node's point
     """
 
+    __slots__ = ("lon", "lat", "map_reader", "id", "incoming_lines_cache", "outgoing_lines_cache")
+
     def __init__(self, map_reader: WebToolMapReader, node_id: int, lon: float, lat: float):
         self.lon = lon
         self.lat = lat
         self.map_reader = map_reader
         self.id = node_id
-        self.incoming_lines_cache = []
-        self.outgoing_lines_cache = []
+        self.incoming_lines_cache: Optional[List[Line]] = None
+        self.outgoing_lines_cache: Optional[List[Line]] = None
 
     @property
     def node_id(self):
@@ -179,47 +219,43 @@ class Node(AbstractNode):
     def coordinates(self) -> Coordinates:
         return Coordinates(lon=self.lon, lat=self.lat)
 
+    def _fetch_connected(self):
+        """
+        Fills both line caches from a single query of the rows incident to this node.
+        Each row is expanded into its one-way line(s), which are then sorted into
+        outgoing and incoming by the node they start and end at.
+        """
+        incoming = []
+        outgoing = []
+        far_ends = set()
+        with self.map_reader.connection.cursor() as cursor:
+            cursor.execute(self.map_reader.incident_lines_query,
+                           (self.node_id, self.node_id))
+            rows = cursor.fetchall()
+        for row, ls in zip(rows, parse_geometries(rows)):
+            (line_id, _, _, _, _, _, from_int, to_int, _) = row
+            for l in self.map_reader._lines_from_row(row, ls):
+                start, end = (from_int, to_int) if l.id == line_id else (to_int, from_int)
+                if start == self.id:
+                    outgoing.append(l)
+                if end == self.id:
+                    incoming.append(l)
+                far_ends.add(end if start == self.id else start)
+        # load the nodes at the other end of these lines in one query, rather than one
+        # query each when the decoder follows them
+        self.map_reader.get_nodes_by_ids(far_ends)
+        self.incoming_lines_cache = incoming
+        self.outgoing_lines_cache = outgoing
+
     def outgoing_lines(self) -> Iterable[Line]:
-        if len(self.outgoing_lines_cache) > 0:
-            for line in self.outgoing_lines_cache:
-                yield line
-        else:
-            with self.map_reader.connection.cursor() as cursor:
-                cursor.execute(self.map_reader.outgoing_lines_query,
-                               (self.node_id, self.node_id))
-                for (line_id, meta, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                    l = self.map_reader.line_cache.get(line_id)
-                    if l is not None:
-                        self.outgoing_lines_cache.append(l)
-                        yield l
-                    else:
-                        ls = LineString(wkb.loads(geom, hex=True))
-                        l = Line(self.map_reader, line_id, meta, FOW(
-                            fow), FRC(frc), length, self, to_int, ls)
-                        self.map_reader.line_cache[line_id] = l
-                        self.outgoing_lines_cache.append(l)
-                        yield l
+        if self.outgoing_lines_cache is None:
+            self._fetch_connected()
+        return iter(self.outgoing_lines_cache)
 
     def incoming_lines(self) -> Iterable[Line]:
-        if len(self.incoming_lines_cache) > 0:
-            for line in self.incoming_lines_cache:
-                yield line
-        else:
-            with self.map_reader.connection.cursor() as cursor:
-                cursor.execute(self.map_reader.incoming_lines_query,
-                               (self.node_id, self.node_id))
-                for (line_id, meta, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                    l = self.map_reader.line_cache.get(line_id)
-                    if l is not None:
-                        self.incoming_lines_cache.append(l)
-                        yield l
-                    else:
-                        ls = LineString(wkb.loads(geom, hex=True))
-                        l = Line(self.map_reader, line_id, meta, FOW(
-                            fow), FRC(frc), length, from_int, self, ls)
-                        self.map_reader.line_cache[line_id] = l
-                        self.incoming_lines_cache.append(l)
-                        yield l
+        if self.incoming_lines_cache is None:
+            self._fetch_connected()
+        return iter(self.incoming_lines_cache)
 
     def connected_lines(self) -> Iterable[Line]:
         return chain(self.incoming_lines(), self.outgoing_lines())
@@ -262,6 +298,30 @@ class WebToolMapReader(MapReader):
             A Config object containing default match parameters 
             which will be used by the match() method if no config
             is supplied in the call.
+        knn_limit:Optional[int]
+            Maximum number of rows returned by the radius searches, nearest
+            first.  None returns every row within the search radius; a limit
+            trades candidates beyond the nearest rows for fewer rows to load.
+            Default: None
+        fetch_size:int
+            Number of rows fetched per round trip by the server-side cursors
+            used to scan the whole lines and nodes tables
+            Default: 10000
+        prefetch:bool
+            Whether match() bulk-loads all lines and nodes around the location
+            reference points into the caches before decoding, instead of
+            fetching them one at a time as the decoder reaches them
+            Default: False
+        match_cache_size:Optional[int]
+            Number of match() results kept, keyed by code and config object, so that
+            codes matched again with the same config are not decoded again.  0
+            disables the cache, None leaves it unbounded.
+            Default: 0
+        stream_radius_searches:bool
+            Whether find_lines_close_to() reads its rows through a server-side
+            cursor, fetch_size rows at a time, rather than in one round trip.  This
+            only pays off for very large search radii without a knn_limit.
+            Default: False
 
     Example usage:
 
@@ -297,10 +357,16 @@ class WebToolMapReader(MapReader):
 
     """
 
+    # SRID of the geometries in the lines and nodes tables
+    srid: int = 4326
+
     def __init__(self, geo_tool: GeoTool, host: str, port: int = 5432, user: str = "", password: str = "",
                  dbname: str = "openlr", schema: str = "local", lines_table: str = "roads",
-                 nodes_table: str = "intersections", config: Config = DEFAULT_CONFIG):
+                 nodes_table: str = "intersections", config: Config = DEFAULT_CONFIG,
+                 knn_limit: Optional[int] = None, fetch_size: int = 10000, prefetch: bool = False,
+                 match_cache_size: Optional[int] = 0, stream_radius_searches: bool = False):
 
+        self.geo_tool: GeoTool = geo_tool
         self.lines_table: str = lines_table
         self.nodes_table: str = nodes_table
         self.node_cache: Dict = {}
@@ -321,49 +387,83 @@ class WebToolMapReader(MapReader):
         # default match config
         self.config: Config = config
 
+        # maximum number of candidates returned by find_nodes_close_to/find_lines_close_to
+        self.knn_limit: Optional[int] = knn_limit
+        # rows per round trip of the full-table scans in get_lines/get_nodes
+        self.fetch_size: int = fetch_size
+        # bulk-load the nodes around the LRPs at the start of match()
+        self.prefetch: bool = prefetch
+        # results of earlier matches: (code, id(config)) -> (config, result)
+        self.match_cache: LRUCache = LRUCache(match_cache_size)
+        # read the rows of find_lines_close_to() through a server-side cursor
+        self.stream_radius_searches: bool = stream_radius_searches
+        # area whose lines and nodes are all in the caches, if any
+        self.prefetched_bbox: Optional[Tuple[float, float, float, float]] = None
+        # the lines loaded by the last prefetch, and an R-tree over their geometries
+        self.prefetched_lines: List[Line] = []
+        self.prefetched_tree: Optional[shapely.STRtree] = None
+
         self.get_line_query = sql.SQL(LINE_QUERY + " where id=%s").format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.lines_table))
+        # each row is read once and expanded into its one-way line(s) by _lines_from_row()
         self.get_lines_query = sql.SQL(
-            LINE_QUERY + " where flowdir in (1,3) union " + REV_LINE_QUERY + " where flowdir in (1,2)").format(
+            LINE_QUERY + " where flowdir in (1,2,3)").format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.lines_table))
         self.get_linecount_query = sql.SQL(f"select count(1) from {self.schema}.{self.lines_table}").format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.lines_table))
-        self.get_node_query = sql.SQL(NODE_QUERY + " where id=%s").format(
-            schema=sql.Identifier(self.schema),
-            table=sql.Identifier(self.nodes_table))
         self.get_nodes_query = sql.SQL(NODE_QUERY).format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.nodes_table))
         self.get_nodecount_query = sql.SQL(f"select count(1) from {self.schema}.{self.lines_table}").format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.nodes_table))
+        # The radius searches walk the GiST index on geom in distance order (<->) and stop
+        # after knn_limit rows.  Lines are returned once and reversed in _lines_from_row(),
+        # since a UNION over a CTE would prevent the index-driven ordering.
         self.find_nodes_close_to_query = sql.SQL(
-            NODE_QUERY + " where geom && st_buffer(ST_GeographyFromText('SRID=4326;POINT(%s %s)'), %s)::geometry").format(
+            NODE_QUERY + KNN_4326_FILTER).format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.nodes_table))
-        self.find_lines_close_to_query = sql.SQL(f"""
-            with sq as ({LINE_QUERY} where geom && st_buffer(ST_GeographyFromText('SRID=4326;POINT(%s %s)'), %s)::geometry)
-                ({LINE_QUERY_SELECT} from sq where sq.flowdir in (1,3)) 
-                union 
-                ({REV_LINE_QUERY_SELECT} from sq where sq.flowdir in (1,2))
-        """).format(
+        self.find_lines_close_to_query = sql.SQL(
+            LINE_QUERY + KNN_4326_FILTER).format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.lines_table))
-        self.outgoing_lines_query = sql.SQL(
-            LINE_QUERY + " where from_int = %s and flowdir in (1,3) union " + REV_LINE_QUERY + " where to_int = %s and flowdir in (1,2)").format(
-            table=sql.Identifier(self.lines_table),
-            schema=sql.Identifier(self.schema))
-        self.incoming_lines_query = sql.SQL(
-            LINE_QUERY + " where to_int = %s and flowdir in (1,3) union " + REV_LINE_QUERY + " where from_int = %s and flowdir in (1,2)").format(
+        self.lines_in_bbox_query = sql.SQL(
+            LINE_QUERY + " where geom && ST_MakeEnvelope(%s, %s, %s, %s, %s)").format(
             table=sql.Identifier(self.lines_table),
             schema=sql.Identifier(self.schema))
 
         self.connection = pg.connect(
             host=self.host, port=self.port, user=self.user, password=self.password, dbname=self.dbname)
 
+        # The lookups run many times per decode are prepared once on the connection, so
+        # PostgreSQL parses and plans them only once
+        self.get_node_query = self._prepare(
+            "webtool_get_node", "bigint", NODE_QUERY + " where id = $1", self.nodes_table)
+        self.get_nodes_by_ids_query = self._prepare(
+            "webtool_get_nodes_by_ids", "bigint[]", NODE_QUERY + " where id = any($1)", self.nodes_table)
+        # both the incoming and the outgoing lines of a node, fetched in one round trip
+        self.incident_lines_query = self._prepare(
+            "webtool_incident_lines", "bigint, bigint", LINE_QUERY + " where from_int = $1 or to_int = $2",
+            self.lines_table)
+        self.connection.commit()
+
+    def _prepare(self, name: str, arg_types: str, query: str, table: str) -> sql.Composed:
+        """
+        Prepares `query`, which uses $n placeholders and {schema}/{table} fields, on the
+        connection under `name`.  Returns the statement executing it with %s parameters.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql.SQL("prepare {name} (" + arg_types + ") as " + query).format(
+                name=sql.Identifier(name),
+                schema=sql.Identifier(self.schema),
+                table=sql.Identifier(table)))
+        placeholders = ", ".join(["%s"] * len(arg_types.split(",")))
+        return sql.SQL("execute {name} (" + placeholders + ")").format(name=sql.Identifier(name))
+
     def match(self, binstr: str, clear_cache: bool = True, config: Optional[Config] = None) -> MapObjects:
         """
         Decode an OpenLR binary string
@@ -389,12 +489,119 @@ class WebToolMapReader(MapReader):
         if config == None:
             config = self.config
 
+        # keyed by the config's identity, since configs hold dicts and are not hashable;
+        # the entry keeps its config alive, so the id cannot be reused while it is cached
+        key = (binstr, id(config))
+        hit = self.match_cache.get(key)
+        if hit is not None and hit[0] is config:
+            return hit[1]
+        res = self._match(binstr, clear_cache, config)
+        if self.match_cache.maxsize != 0:
+            self.match_cache[key] = (config, res)
+        return res
+
+    def _match(self, binstr: str, clear_cache: bool, config: Config) -> MapObjects:
+        """Decodes `binstr` with `config`, bypassing the match cache"""
         ref = binary_decode(binstr)
         if clear_cache:
-            self.node_cache.clear()
-            self.line_cache.clear()
+            self.clear_caches()
+        if self.prefetch:
+            self.prefetch_reference(ref, config)
         return cast(MapObjects, decode(reference=ref, reader=cast(MapReader, self), config=cast(Config, config)))
 
+    def clear_caches(self):
+        """Empties the line and node caches"""
+        self.node_cache.clear()
+        self.line_cache.clear()
+        self.prefetched_bbox = None
+        self.prefetched_lines = []
+        self.prefetched_tree = None
+
+    def bbox_around(self, points: Sequence, dist: float) -> Tuple[float, float, float, float]:
+        """
+        Returns the (min_lon, min_lat, max_lon, max_lat) bounding box of `points`,
+        grown by at least `dist` meters on every side, so that it contains every
+        point within `dist` meters of them
+        """
+        frames = [search_frame(p.lon, p.lat, dist) for p in points]
+        return (min(f[0] for f in frames), min(f[1] for f in frames),
+                max(f[2] for f in frames), max(f[3] for f in frames))
+
+    def prefetch_reference(self, ref, config: Config):
+        """
+        Loads the lines and nodes around the location reference points of `ref` into
+        the caches.  References without LRPs (i.e. geo-coordinates) are ignored.
+        """
+        points = getattr(ref, "points", None)
+        if points:
+            self.prefetch_area(self.bbox_around(points, config.search_radius * PREFETCH_RADIUS_FACTOR))
+
+    def prefetch_area(self, bbox: Tuple[float, float, float, float]):
+        """
+        Loads every line intersecting `bbox` (min_x, min_y, max_x, max_y, in the SRID
+        of the tables) and the nodes they connect into the caches, with one query
+        for the lines and one COPY plus one batched lookup for the nodes.  The
+        incoming and outgoing lines of the nodes inside `bbox` are complete after
+        this, so their caches are filled as well, and find_lines_close_to() answers
+        searches falling inside `bbox` from the line cache.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.lines_in_bbox_query, (*bbox, self.srid))
+            rows = cursor.fetchall()
+        lines = [l for row, ls in zip(rows, parse_geometries(rows)) for l in self._lines_from_row(row, ls)]
+        self.prefetch_nodes(bbox)
+        self.get_nodes_by_ids(chain.from_iterable((row[6], row[7]) for row in rows))
+
+        min_x, min_y, max_x, max_y = bbox
+        inside = {node_id: ([], []) for node_id, n in self.node_cache.items()
+                  if min_x <= n.lon <= max_x and min_y <= n.lat <= max_y and n.incoming_lines_cache is None}
+        for l in lines:
+            start, end = node_id_of(l.from_int), node_id_of(l.to_int)
+            if start in inside:
+                inside[start][1].append(l)
+            if end in inside:
+                inside[end][0].append(l)
+        for node_id, (incoming, outgoing) in inside.items():
+            n = self.node_cache[node_id]
+            n.incoming_lines_cache = incoming
+            n.outgoing_lines_cache = outgoing
+        self.prefetched_lines = lines
+        self.prefetched_tree = shapely.STRtree([l.geometry for l in lines])
+        self.prefetched_bbox = bbox
+
+    def _is_prefetched(self, bbox: Tuple[float, float, float, float]) -> bool:
+        """Whether `bbox` lies within the prefetched area"""
+        if self.prefetched_bbox is None:
+            return False
+        min_x, min_y, max_x, max_y = self.prefetched_bbox
+        return min_x <= bbox[0] and min_y <= bbox[1] and bbox[2] <= max_x and bbox[3] <= max_y
+
+    def prefetch_nodes(self, bbox: Optional[Tuple[float, float, float, float]] = None):
+        """
+        Bulk-loads nodes into the node cache with a single COPY ... TO STDOUT, rather
+        than one query per node.
+
+        Arguments:
+            bbox:Optional[Tuple[float, float, float, float]]
+                (min_x, min_y, max_x, max_y) in the SRID of the nodes table.  Only the
+                nodes inside it are loaded.  If None, the whole table is loaded.
+                Default: None
+        """
+        query = sql.SQL(NODE_QUERY).format(
+            schema=sql.Identifier(self.schema),
+            table=sql.Identifier(self.nodes_table))
+        if bbox is not None:
+            query = query + sql.SQL(" where geom && ST_MakeEnvelope({}, {}, {}, {}, {})").format(
+                *(sql.Literal(float(v)) for v in bbox), sql.Literal(self.srid))
+        buf = StringIO()
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(sql.SQL("copy ({}) to stdout with (format csv)").format(query), buf)
+        buf.seek(0)
+        for (node_id, lon, lat) in csv.reader(buf):
+            node_id = int(node_id)
+            if node_id not in self.node_cache:
+                self.node_cache[node_id] = Node(self, node_id, float(lon), float(lat))
+
     def get_line(self, line_id: int) -> Line:
         # Just verify that this line ID exists.
         l = self.line_cache.get(line_id)
@@ -403,19 +610,39 @@ class WebToolMapReader(MapReader):
         raise WebToolMapException(
             f"Line {line_id} should have been in the cache but was not found")
 
+    def _streaming_cursor(self):
+        """
+        Returns a named (server-side) cursor which fetches its result set in batches of
+        fetch_size rows instead of buffering all of it on the client.  It runs inside the
+        connection's current transaction.
+        """
+        cursor = self.connection.cursor(name=f"webtool_{uuid4().hex}")
+        cursor.itersize = self.fetch_size
+        return cursor
+
+    def _stream_rows(self, query, params=None) -> Iterable[List[tuple]]:
+        """
+        Runs `query` on a server-side cursor and yields its result set in lists of up
+        to fetch_size rows.  The cursor is closed as soon as the rows are exhausted or
+        the generator is closed, so callers wrap it in closing() to release the
+        server-side portal when they stop early.
+        """
+        cursor = self._streaming_cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
     def get_lines(self) -> Iterable[Line]:
-        with self.connection.cursor() as cursor:
-            cursor.execute(self.get_lines_query)
-            for (line_id, meta, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                l = self.line_cache.get(line_id)
-                if l is not None:
-                    yield l
-                else:
-                    ls = LineString(wkb.loads(geom, hex=True))
-                    l = Line(self, line_id, meta, FOW(fow), FRC(
-                        frc), length, from_int, to_int, ls)
-                    self.line_cache[line_id] = l
-                    yield l
+        with closing(self._stream_rows(self.get_lines_query)) as batches:
+            for rows in batches:
+                for row, ls in zip(rows, parse_geometries(rows)):
+                    yield from self._lines_from_row(row, ls)
 
     def get_linecount(self) -> int:
         with self.connection.cursor() as cursor:
@@ -442,17 +669,31 @@ class WebToolMapReader(MapReader):
             self.node_cache[node_id] = n
             return n
 
+    def get_nodes_by_ids(self, node_ids: Iterable[int]) -> List[Node]:
+        """
+        Returns the nodes with the given ids.  Those not yet in the node cache are
+        retrieved with a single query and added to it.  Unknown ids are skipped.
+        """
+        node_ids = list(node_ids)
+        missing = [node_id for node_id in set(node_ids) if node_id not in self.node_cache]
+        if missing:
+            with self.connection.cursor() as cursor:
+                cursor.execute(self.get_nodes_by_ids_query, (missing,))
+                for (node_id, lon, lat) in cursor:
+                    self.node_cache[node_id] = Node(self, node_id, lon, lat)
+        return [self.node_cache[node_id] for node_id in node_ids if node_id in self.node_cache]
+
     def get_nodes(self) -> Iterable[Node]:
-        with self.connection.cursor() as cursor:
-            cursor.execute(self.get_nodes_query)
-            for (node_id, lon, lat) in cursor:
-                n = self.node_cache.get(node_id)
-                if n is not None:
-                    yield n
-                else:
-                    n = Node(self, node_id, lon, lat)
-                    self.node_cache[node_id] = n
-                    yield n
+        with closing(self._stream_rows(self.get_nodes_query)) as batches:
+            for rows in batches:
+                for (node_id, lon, lat) in rows:
+                    n = self.node_cache.get(node_id)
+                    if n is not None:
+                        yield n
+                    else:
+                        n = Node(self, node_id, lon, lat)
+                        self.node_cache[node_id] = n
+                        yield n
 
     def get_nodecount(self) -> int:
         with self.connection.cursor() as cursor:
@@ -464,12 +705,15 @@ class WebToolMapReader(MapReader):
             (count,) = res
             return count
 
+    def _radius_params(self, coord: Coordinates, dist: float) -> Dict[str, Optional[float]]:
+        "Query parameters for the radius searches around `coord`"
+        return {"lon": coord.lon, "lat": coord.lat, "dist": dist, "limit": self.knn_limit}
+
     def find_nodes_close_to(self, coord: Coordinates, dist: float) -> Iterable[Node]:
         """Finds all nodes in a given radius, given in meters
         Yields every node within this distance to `coord`."""
-        lon, lat = coord.lon, coord.lat
         with self.connection.cursor() as cursor:
-            cursor.execute(self.find_nodes_close_to_query, (lon, lat, dist))
+            cursor.execute(self.find_nodes_close_to_query, self._radius_params(coord, dist))
             # nodes = cursor.fetchall()
             for (node_id, lon, lat) in cursor:
                 n = self.node_cache.get(node_id)
@@ -482,16 +726,70 @@ class WebToolMapReader(MapReader):
 
     def find_lines_close_to(self, coord: Coordinates, dist: float) -> Iterable[Line]:
         "Yields all lines within `dist` meters around `coord`"
-        lon, lat = coord.lon, coord.lat
+        if self._is_prefetched(self.bbox_around([coord], dist)):
+            yield from self._find_cached_lines_close_to(coord, dist)
+            return
+        if self.stream_radius_searches:
+            # rows arrive nearest first, fetch_size at a time
+            # closing() releases the server-side cursor as soon as this generator is
+            # closed, even if the caller stopped before the last batch
+            with closing(self._stream_rows(self.find_lines_close_to_query,
+                                           self._radius_params(coord, dist))) as batches:
+                for rows in batches:
+                    yield from self._candidate_lines(rows)
+            return
+        # a radius holds few rows: read them in one round trip
         with self.connection.cursor() as cursor:
-            cursor.execute(self.find_lines_close_to_query, (lon, lat, dist))
-            for (line_id, meta, fow, _, frc, length, from_int, to_int, geom) in cursor:
-                l = self.line_cache.get(line_id)
-                if l is not None:
-                    yield l
-                else:
-                    ls = LineString(wkb.loads(geom, hex=True))
-                    l = Line(self, line_id, meta, FOW(fow), FRC(
-                        frc), length, from_int, to_int, ls)
-                    self.line_cache[line_id] = l
-                    yield l
+            cursor.execute(self.find_lines_close_to_query, self._radius_params(coord, dist))
+            rows = cursor.fetchall()
+        yield from self._candidate_lines(rows)
+
+    def _candidate_lines(self, rows) -> Iterable[Line]:
+        "Yields the lines of a batch of radius search rows"
+        # resolve the end points of all candidates in one query before the decoder walks them
+        self.get_nodes_by_ids(chain.from_iterable((row[6], row[7]) for row in rows))
+        for row, ls in zip(rows, parse_geometries(rows)):
+            yield from self._lines_from_row(row, ls)
+
+    def _find_cached_lines_close_to(self, coord: Coordinates, dist: float) -> Iterable[Line]:
+        """
+        Answers find_lines_close_to() from the prefetched lines: the lines within
+        `dist` meters of `coord`, nearest first, limited to knn_limit DB rows (a line
+        and its reversal count once).  The R-tree narrows the lines down to those whose
+        envelope meets the search box before any distance is measured.
+        """
+        hits = self.prefetched_tree.query(shapely.box(*self.bbox_around([coord], dist)))
+        candidates = (self.prefetched_lines[i] for i in hits)
+        by_distance = sorted(((d, l) for d, l in ((l.distance_to(coord), l) for l in candidates)
+                              if d <= dist), key=lambda pair: pair[0])
+        row_ids = set()
+        for _, l in by_distance:
+            row_id = abs(l.line_id)
+            if row_id not in row_ids:
+                if self.knn_limit is not None and len(row_ids) >= self.knn_limit:
+                    continue
+                row_ids.add(row_id)
+            yield l
+
+    def _lines_from_row(self, row, ls: LineString) -> Iterable[Line]:
+        """
+        Yields the one-way line(s) represented by a row of the lines table, whose
+        geometry has already been parsed into `ls`: the line itself if it can be
+        travelled in its digitization direction (flowdir 1 or 3), and its reversal,
+        with a negated id, if it can be travelled against it (flowdir 1 or 2).
+        """
+        (line_id, meta, fow, flowdir, frc, length, from_int, to_int, _) = row
+        if flowdir in (1, 3):
+            l = self.line_cache.get(line_id)
+            if l is None:
+                l = Line(self, line_id, meta, FOW_LUT[fow], FRC_LUT[
+                    frc], length, from_int, to_int, ls)
+                self.line_cache[line_id] = l
+            yield l
+        if flowdir in (1, 2):
+            l = self.line_cache.get(-line_id)
+            if l is None:
+                l = Line(self, -line_id, meta, FOW_LUT[fow], FRC_LUT[
+                    frc], length, to_int, from_int, ls.reverse())
+                self.line_cache[-line_id] = l
+            yield l
@@ -17,9 +17,9 @@ Dependencies:
 
 from __future__ import annotations
 
-from typing import Optional, cast
+from typing import List, cast
 
-from openlr import Coordinates, LocationReferencePoint
+from openlr import LocationReferencePoint
 from openlr import binary_decode
 from psycopg2 import sql
 
@@ -27,59 +27,50 @@ from webtool.geotools.geotool_3857 import GeoTool_3857
 from openlr_dereferencer import decode, Config
 from openlr_dereferencer.decoding import MapObjects
 from openlr_dereferencer.maps import MapReader
-from .webtool import WebToolMapReader, NODE_QUERY, LINE_QUERY, LINE_QUERY_SELECT, REV_LINE_QUERY_SELECT
+from .webtool import WebToolMapReader, NODE_QUERY, LINE_QUERY
+
+# Radius filter and nearest-first ordering appended to the radius searches.
+# ST_DWithin on planar geometries expands to an index-assisted && test itself.
+# Parameters: {"lon", "lat", "dist", "limit"}, with lon/lat holding x/y
+KNN_3857_FILTER = (" where ST_DWithin(geom, ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 3857), %(dist)s)"
+                   " order by geom <-> ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 3857) limit %(limit)s")
 
 
 class WebToolMapReader3857(WebToolMapReader):
+    srid: int = 3857
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.geo_tool = GeoTool_3857()
         self.find_nodes_close_to_query = sql.SQL(
-            NODE_QUERY + " where geom && st_buffer(ST_GeometryFromText('SRID=3857;POINT(%s %s)'), %s)::geometry").format(
+            NODE_QUERY + KNN_3857_FILTER).format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.nodes_table))
-        self.find_lines_close_to_query = sql.SQL(f"""
-            with sq as ({LINE_QUERY} where geom && st_buffer(ST_GeometryFromText('SRID=3857;POINT(%s %s)'), %s)::geometry)
-                ({LINE_QUERY_SELECT} from sq where sq.flowdir in (1,3)) 
-                union 
-                ({REV_LINE_QUERY_SELECT} from sq where sq.flowdir in (1,2))
-        """).format(
+        self.find_lines_close_to_query = sql.SQL(
+            LINE_QUERY + KNN_3857_FILTER).format(
             schema=sql.Identifier(self.schema),
             table=sql.Identifier(self.lines_table))
 
-    def transform_lrp(self, lrp: LocationReferencePoint) -> LocationReferencePoint:
-        t_coord = self.geo_tool.transform_coordinate(Coordinates(lon=lrp.lon, lat=lrp.lat))
-        return lrp._replace(lon=t_coord.lon, lat=t_coord.lat)
-
-    def match(self, binstr: str, clear_cache: bool = True, config: Optional[Config] = None) -> MapObjects:
+    def bbox_around(self, points, dist: float):
         """
-        Decode an OpenLR binary string
-
-        Arguments:
-            binstr:str
-                binary-encoded OpenLR string (i.e. "C7xSuRUHaAEcKfncBo4BKx8=")
-            clear_cache:bool
-                whether to clear the internal line and node cache before matching
-                Default: True
-            config:Optional[Config]
-                configuration object which overrides instance level config
-                Default: None
-
-        Returns:
-            A registered subtype of MapObjects( currently Coordinates, LineLocation, 
-            PointAlongLine, or PoiWithAccessPoint)
-
-        Raises:
-            LRDecodeError:
-                Raised if the decoding process was not successful.
+        Returns the bounding box of `points`, grown by `dist` meters on every side
         """
-        if config is None:
-            config = self.config
+        xs = [p.lon for p in points]
+        ys = [p.lat for p in points]
+        return min(xs) - dist, min(ys) - dist, max(xs) + dist, max(ys) + dist
+
+    def transform_lrps(self, lrps: List[LocationReferencePoint]) -> List[LocationReferencePoint]:
+        """Transforms all LRPs of a reference into 3857 with a single pyproj call"""
+        xys = self.geo_tool.transform_coordinates(lrps)
+        return [lrp._replace(lon=float(x), lat=float(y)) for lrp, (x, y) in zip(lrps, xys)]
 
+    def _match(self, binstr: str, clear_cache: bool, config: Config) -> MapObjects:
+        """Decodes `binstr` with `config` after projecting its LRPs into 3857"""
         ref = binary_decode(binstr)
-        ref = ref._replace(points=[self.transform_lrp(lrp) for lrp in ref.points])
+        ref = ref._replace(points=self.transform_lrps(ref.points))
         if clear_cache:
-            self.node_cache.clear()
-            self.line_cache.clear()
+            self.clear_caches()
+        if self.prefetch:
+            self.prefetch_reference(ref, config)
         return cast(MapObjects, decode(reference=ref, reader=cast(MapReader, self), config=cast(Config, config),
                                        geo_tool=self.geo_tool))
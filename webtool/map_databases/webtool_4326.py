@@ -16,7 +16,7 @@ Dependencies:
 """
 
 from __future__ import annotations
-from typing import Optional, cast
+from typing import cast
 from openlr import binary_decode
 from webtool.geotools.geotool_4326 import GeoTool_4326
 from openlr_dereferencer import decode, Config
@@ -30,13 +30,11 @@ class WebToolMapReader4326(WebToolMapReader):
         super().__init__(**kwargs)
         self.geo_tool = GeoTool_4326()
 
-    def match(self, binstr: str, clear_cache: bool = True, config: Optional[Config] = None) -> MapObjects:
-        if config is None:
-            config = self.config
-
+    def _match(self, binstr: str, clear_cache: bool, config: Config) -> MapObjects:
         ref = binary_decode(binstr)
         if clear_cache:
-            self.node_cache.clear()
-            self.line_cache.clear()
+            self.clear_caches()
+        if self.prefetch:
+            self.prefetch_reference(ref, config)
         return cast(MapObjects, decode(reference=ref, reader=cast(MapReader, self), config=cast(Config, config),
                                        geo_tool=self.geo_tool))
@@ -25,7 +25,7 @@ from typing import Iterable, Optional, Dict, cast
 
 # import param
 from openlr import Coordinates, FOW
-from openlr import binary_decode, FRC
+from openlr import FRC
 from pyproj import Geod
 from shapely import wkb
 from shapely.geometry import LineString, Point
@@ -36,6 +36,7 @@ from openlr_dereferencer.decoding import MapObjects, DEFAULT_CONFIG
 from openlr_dereferencer.maps.abstract import GeoTool
 from openlr_dereferencer.maps import Line as AbstractLine, Node as AbstractNode
 from openlr_dereferencer.maps import MapReader
+from .common import FOW_LUT, FRC_LUT, decode_ref
 
 GEOD = Geod(ellps="WGS84")
 SQRT_2 = sqrt(2)
@@ -78,6 +79,8 @@ class Line(AbstractLine):
             shapely LineString representing this line's geometry
     """
 
+    __slots__ = ("id", "_meta", "map_reader", "_fow", "_frc", "_length", "from_int", "to_int", "_geometry")
+
     def __init__(self, map_reader: WebToolMapReaderSQLite, line_id: int, meta: str, fow: FOW, frc: FRC, length: float,
                  from_int: int | Node, to_int: int | Node, geometry: LineString):
         self.id = line_id
@@ -105,7 +108,7 @@ class Line(AbstractLine):
 
     @property
     def start_node(self) -> "Node":
-        if type(self.from_int) == Node:
+        if isinstance(self.from_int, Node):
             return self.from_int  # type:ignore
         else:
             self.from_int = self.map_reader.get_node(
@@ -114,7 +117,7 @@ class Line(AbstractLine):
 
     @property
     def end_node(self) -> "Node":
-        if type(self.to_int) == Node:
+        if isinstance(self.to_int, Node):
             return cast(Node, self.to_int)
         else:
             self.to_int = self.map_reader.get_node(cast(int, self.to_int))
@@ -158,6 +161,8 @@ class Node(AbstractNode):
             WGS84 latitude of this node's point
     """
 
+    __slots__ = ("lon", "lat", "map_reader", "id", "incoming_lines_cache", "outgoing_lines_cache")
+
     def __init__(self, map_reader: WebToolMapReaderSQLite, node_id: int, lon: float, lat: float):
         self.lon = lon
         self.lat = lat
@@ -192,8 +197,7 @@ class Node(AbstractNode):
                         yield line
                     else:
                         ls = LineString(wkb.loads(geom, hex=False))
-                        line = Line(self.map_reader, line_id, meta, FOW(
-                            fow), FRC(frc), length, self, to_int, ls)
+                        line = Line(self.map_reader, line_id, meta, FOW_LUT[fow], FRC_LUT[frc], length, self, to_int, ls)
                         self.map_reader.line_cache[line_id] = line
                         self.outgoing_lines_cache.append(line)
                         yield line
@@ -216,8 +220,7 @@ class Node(AbstractNode):
                         yield l
                     else:
                         ls = LineString(wkb.loads(geom, hex=False))
-                        l = Line(self.map_reader, line_id, meta, FOW(
-                            fow), FRC(frc), length, from_int, self, ls)
+                        l = Line(self.map_reader, line_id, meta, FOW_LUT[fow], FRC_LUT[frc], length, from_int, self, ls)
                         self.map_reader.line_cache[line_id] = l
                         self.incoming_lines_cache.append(l)
                         yield l
@@ -255,6 +258,11 @@ class WebToolMapReaderSQLite(MapReader):
             A Config object containing default match parameters 
             which will be used by the match() method if no config
             is supplied in the call.
+        immutable:bool
+            Open the DB with SQLite's `immutable` URI parameter, which
+            disables all file locking and change detection.  Only set
+            this if nothing will modify the DB file while it is open.
+            Default: False
 
     Example usage:
 
@@ -285,10 +293,14 @@ class WebToolMapReaderSQLite(MapReader):
         )
     >>> rdr.match("C2Br9xiypCOYCv1L/9kjBw==")
 
+    Opening the connection and loading the Spatialite extension is
+    comparatively expensive, so a reader is meant to be created once and
+    reused for every code to be matched (see batch_match.py, which creates
+    one reader per worker process).
     """
 
     def __init__(self, db_filename: str, geo_tool: GeoTool, mod_spatialite: str = "mod_spatialite", lines_table: str = "line",
-                 nodes_table: str = "nodes", config: Config = DEFAULT_CONFIG):
+                 nodes_table: str = "nodes", config: Config = DEFAULT_CONFIG, immutable: bool = False):
 
         self.db_filename = db_filename
         self.geo_tool = geo_tool
@@ -305,7 +317,7 @@ class WebToolMapReaderSQLite(MapReader):
         self.rev_line_query = self.rev_line_query_select + f" from {self.lines_table}"
         self.node_query = self.node_query_select + f" from {self.nodes_table}"
         self.get_line_query = self.line_query + " where id=?"
-        self.get_lines_query = self.line_query + " where flowdir in (1,3) union " + self.rev_line_query + " where flowdir in (1,2)"
+        self.get_lines_query = self.line_query
         self.get_linecount_query = f"select count(1) from {self.lines_table}"
         self.get_node_query = self.node_query + " where id=?"
         self.get_nodes_query = self.node_query
@@ -335,7 +347,18 @@ class WebToolMapReaderSQLite(MapReader):
         self.incoming_lines_query = self.line_query + " where to_int = ? and flowdir in (1,3) union " + self.rev_line_query + " where from_int = ? and flowdir in (1,2)"
 
 
-        self.connection = connect(f"file:{self.db_filename}?mode=ro", uri=True)
+        uri = f"file:{self.db_filename}?mode=ro"
+        if immutable:
+            uri += "&immutable=1"
+        # autocommit mode: the reader never writes, so there is no point in the
+        # sqlite3 module opening implicit transactions around its queries
+        self.connection = connect(uri, uri=True, isolation_level=None)
+        # The reader only ever queries the DB: keep temporary b-trees in memory,
+        # use a 64MB page cache and memory-map up to 1GB of the file
+        self.connection.execute("PRAGMA query_only=1")
+        self.connection.execute("PRAGMA temp_store=MEMORY")
+        self.connection.execute("PRAGMA cache_size=-65536")
+        self.connection.execute("PRAGMA mmap_size=1073741824")
         self.connection.enable_load_extension(True)
         _ = self.connection.execute(f"""select load_extension("{self.mod_spatialite}")""").fetchall()
 
@@ -364,7 +387,7 @@ class WebToolMapReaderSQLite(MapReader):
         if config is None:
             config = self.config
 
-        ref = binary_decode(binstr)
+        ref = decode_ref(binstr)
         if clear_cache:
             self.node_cache.clear()
             self.line_cache.clear()
@@ -385,15 +408,25 @@ class WebToolMapReaderSQLite(MapReader):
             cursor.execute(self.get_lines_query)
             # end_time = time();
             # print(f"get_lines query: {end_time - start_time}")
+            # Each line is read once; lines that can be travelled against their
+            # digitization direction (flowdir 1 or 2) are reversed here rather than
+            # with a UNION over the table
             for (line_id, meta, fow, flowdir, frc, length, from_int, to_int, geom) in cursor:
-                line = self.line_cache.get(line_id)
-                if line is not None:
+                ls = None
+                if flowdir in (1, 3):
+                    line = self.line_cache.get(line_id)
+                    if line is None:
+                        ls = wkb.loads(geom, hex=False)
+                        line = Line(self, line_id, meta, FOW_LUT[fow], FRC_LUT[frc], length, from_int, to_int, ls)
+                        self.line_cache[line_id] = line
                     yield line
-                else:
-                    ls = LineString(wkb.loads(geom, hex=False))
-                    line = Line(self, line_id, meta, FOW(fow), FRC(
-                        frc), length, from_int, to_int, ls)
-                    self.line_cache[line_id] = line
+                if flowdir in (1, 2):
+                    line = self.line_cache.get(-line_id)
+                    if line is None:
+                        if ls is None:
+                            ls = wkb.loads(geom, hex=False)
+                        line = Line(self, -line_id, meta, FOW_LUT[fow], FRC_LUT[frc], length, to_int, from_int, ls.reverse())
+                        self.line_cache[-line_id] = line
                     yield line
 
     def get_linecount(self) -> int:
@@ -492,6 +525,6 @@ class WebToolMapReaderSQLite(MapReader):
                     yield line
                 else:
                     ls = LineString(wkb.loads(geom, hex=False))
-                    line = Line(self, line_id, meta, FOW(fow), FRC(frc), length, from_int, to_int, ls)
+                    line = Line(self, line_id, meta, FOW_LUT[fow], FRC_LUT[frc], length, from_int, to_int, ls)
                     self.line_cache[line_id] = line
                     yield line
@@ -1,6 +1,34 @@
+"""
+    Decode binary openlr codes with a single map reader.  The codes are
+    taken from the command line or, if there are none, read from stdin,
+    one per line, so that the reader is only set up once for many codes.
+    When stdin is a terminal, the example code is decoded instead:
+
+        python single.py C8l2sxv7NBpjDALbAXQaFQ==
+        python single.py < codes.txt
+"""
+
+import sys
+
 from map_databases.tomtom_sqlite import TomTomMapReaderSQLite
 from decoder_configs import StrictConfig
 from webtool.geotools.geotool_4326 import GeoTool_4326
+from openlr_dereferencer.decoding import LineLocation, PointAlongLine, Coordinates
+
+# decoded when no codes are given on the command line and stdin is a terminal
+EXAMPLE_CODE = "C8l2sxv7NBpjDALbAXQaFQ=="
+
+
+def describe(result) -> str:
+    "Formats a decoded map object for printing"
+    if isinstance(result, LineLocation):
+        return repr(result.lines)
+    if isinstance(result, PointAlongLine):
+        return f"{result.line!r} +{result.positive_offset}"
+    if isinstance(result, Coordinates):
+        return f"({result.lon}, {result.lat})"
+    return repr(result)
+
 
 rdr = TomTomMapReaderSQLite(
     db_filename="/Users/dave/projects/python/openlr/data/hris/umd-mnr.db",
@@ -10,5 +38,26 @@ rdr = TomTomMapReaderSQLite(
     geo_tool=GeoTool_4326(),
     config=StrictConfig
 )
-res = rdr.match("C8l2sxv7NBpjDALbAXQaFQ==")
-print(res.lines)
\ No newline at end of file
+
+if sys.argv[1:]:
+    codes = sys.argv[1:]
+elif sys.stdin.isatty():
+    codes = [EXAMPLE_CODE]
+else:
+    codes = (line.strip() for line in sys.stdin)
+
+for code in codes:
+    if not code:
+        continue
+    try:
+        # match() itself logs and swallows decoding failures, but the code is parsed
+        # before that: bad base64 raises binascii.Error (a ValueError), and malformed
+        # references raise whatever the openlr parser trips over
+        res = rdr.match(code)
+    except Exception as e:
+        print(code, f"invalid code: {e}", file=sys.stderr)
+        continue
+    if res is None:
+        print(code, "no location found", file=sys.stderr)
+    else:
+        print(code, describe(res))